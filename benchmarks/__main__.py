@@ -0,0 +1,79 @@
+""" Run the benchmark suite without asv
+
+    python -m benchmarks [pattern]
+
+Runs every benchmark whose name, e.g. ``Estimate.time_estimate(daily, 66, True)``,
+matches the regular expression pattern, and prints the best time per call.
+"""
+import argparse
+import inspect
+import itertools
+import re
+import timeit
+
+from . import benchmarks as suite
+
+
+def _format_time(seconds):
+    for unit, scale in (('s', 1.), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{:.3f} {}'.format(seconds / scale, unit)
+
+    return '{:.1f} ns'.format(seconds / 1e-9)
+
+
+def run(pattern=None, repeat=3):
+    """
+    Time each benchmark of the suite for every combination of its parameters
+
+    Args:
+        pattern (str): Only run benchmarks whose name matches this regular expression
+        repeat (int): Number of timing runs; the best is reported
+
+    Returns:
+        dict: Best time per call, in seconds, by benchmark name
+    """
+    results = {}
+
+    classes = [cls for _, cls in inspect.getmembers(suite, inspect.isclass) if cls.__module__ == suite.__name__]
+    for cls in classes:
+        params = getattr(cls, 'params', [])
+        if params and not isinstance(params[0], (list, tuple)):
+            params = [params]
+
+        methods = sorted(name for name in dir(cls) if name.startswith('time_'))
+
+        for combo in itertools.product(*params):
+            names = ['{}.{}({})'.format(cls.__name__, method, ', '.join(str(p) for p in combo))
+                     for method in methods]
+            if pattern is not None and not any(re.search(pattern, name) for name in names):
+                continue
+
+            bench = cls()
+            try:
+                if hasattr(bench, 'setup'):
+                    bench.setup(*combo)
+            except NotImplementedError:
+                continue
+
+            for method, name in zip(methods, names):
+                if pattern is not None and not re.search(pattern, name):
+                    continue
+
+                fn = getattr(bench, method)
+                timer = timeit.Timer(lambda: fn(*combo))
+                number, _ = timer.autorange()
+                results[name] = min(timer.repeat(repeat, number)) / number
+
+                print('{:<60} {:>12}'.format(name, _format_time(results[name])), flush=True)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the MIDAS benchmarks')
+    parser.add_argument('pattern', nargs='?', help='Regular expression selecting benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timing runs')
+
+    args = parser.parse_args()
+    run(args.pattern, args.repeat)
@@ -0,0 +1,53 @@
+""" Benchmark the window loop of the rolling and recursive drivers: the pandas-level
+estimate and forecast against the array-level backtest_array
+
+Run from the repository root with
+
+    python -m benchmarks.bench_backtest
+"""
+import timeit
+
+import numpy as np
+
+from midas.adl import estimate, forecast, backtest_array, _weight_method
+from midas.mix import MixDesign
+
+from .common import make_mixed
+
+
+def pandas_loop(design, windows, poly):
+    preds = []
+    for start, stop in windows:
+        y, yl, x, yf, ylf, xf = design.iwindow(start, stop)
+
+        res = estimate(y, yl, x, poly=poly)
+
+        preds.append(forecast(xf, ylf, res, poly=poly).iloc[0].values[0])
+
+    return np.array(preds)
+
+
+def array_loop(design, windows, poly):
+    y, yl, x = design.arrays()
+
+    return backtest_array(y, yl, x, windows, _weight_method(poly, design.x))[0]
+
+
+def main(nwindows=100, number=1):
+    print('{:>6} {:>6} {:>12} {:>12} {:>8}'.format('nobs', 'xlag', 'pandas (ms)', 'array (ms)', 'speedup'))
+    for nobs, xlag in ((40, 3), (120, 3), (120, 12), (200, 66)):
+        y_in, x_in = make_mixed((nobs + nwindows) // 4 + 8)
+        design = MixDesign(y_in, x_in, xlag, 1, 1)
+        windows = [(start, start + nobs) for start in range(len(design) - nobs - 1)][:nwindows]
+
+        assert np.allclose(pandas_loop(design, windows, 'beta'), array_loop(design, windows, 'beta'))
+
+        t_pandas = min(timeit.repeat(lambda: pandas_loop(design, windows, 'beta'), number=number, repeat=3))
+        t_array = min(timeit.repeat(lambda: array_loop(design, windows, 'beta'), number=number, repeat=3))
+
+        print('{:>6} {:>6} {:>12.1f} {:>12.1f} {:>7.1f}x'.format(nobs, xlag, 1e3 * t_pandas / number,
+                                                                  1e3 * t_array / number, t_pandas / t_array))
+
+
+if __name__ == '__main__':
+    main()
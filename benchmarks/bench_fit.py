@@ -0,0 +1,32 @@
+""" Benchmark the residual and Jacobian evaluations in midas.fit
+
+Run from the repository root with
+
+    python -m benchmarks.bench_fit
+"""
+import timeit
+
+import numpy as np
+
+from midas.fit import ssr, jacobian
+from midas.weights import polynomial_weights
+
+from .common import make_arrays
+
+
+def main(nobs=200, number=200):
+    print('{:>10} {:>6} {:>12} {:>12}'.format('poly', 'nlags', 'ssr (us)', 'jac (us)'))
+    for poly, params in (('beta', [0.5, 0.2, 1.5, 4., 0.3]), ('expalmon', [0.5, 0.2, 0.01, -0.001, 0.3])):
+        weight_method = polynomial_weights(poly)
+        a = np.array(params)
+        for nlags in (3, 22, 66, 260, 500):
+            x, y, yl = make_arrays(nobs, nlags)
+
+            t_ssr = min(timeit.repeat(lambda: ssr(a, x, y, yl, weight_method), number=number, repeat=3))
+            t_jac = min(timeit.repeat(lambda: jacobian(a, x, y, yl, weight_method), number=number, repeat=3))
+
+            print('{:>10} {:>6} {:>12.1f} {:>12.1f}'.format(poly, nlags, 1e6 * t_ssr / number, 1e6 * t_jac / number))
+
+
+if __name__ == '__main__':
+    main()
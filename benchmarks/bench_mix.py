@@ -0,0 +1,52 @@
+""" Benchmark the high-frequency lag matrix construction in midas.mix
+
+Run from the repository root with
+
+    python -m benchmarks.bench_mix
+"""
+import os
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from midas.mix import lag_matrix
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), os.pardir, 'examples')
+
+
+def lag_matrix_loop(hf_data, lf_index, xlag, horizon):
+    """ The original row-by-row construction, kept as a reference
+    """
+    x_rows = []
+    for lfdate in lf_index:
+        start_hf = hf_data.index.get_indexer([lfdate], method='bfill')[0]
+        x_rows.append(hf_data.iloc[start_hf - horizon: start_hf - xlag - horizon: -1].values)
+
+    return np.array(x_rows)
+
+
+def load_example():
+    gdp = pd.read_csv(os.path.join(EXAMPLES, 'GDP.csv'), parse_dates=['DATE'], index_col='DATE')
+    ads = pd.read_csv(os.path.join(EXAMPLES, 'ADS.csv'), parse_dates=['Date'], index_col='Date', date_format='%m/%d/%Y')
+
+    return gdp.GDP, ads.ADS_Index
+
+
+def main(number=5):
+    gdp, ads = load_example()
+    lf_index = gdp.loc[ads.index[400]:ads.index[-1]].index
+
+    print('{:>6} {:>12} {:>12} {:>8}'.format('xlag', 'loop (ms)', 'vector (ms)', 'speedup'))
+    for xlag in (22, 66, 130, 260):
+        assert np.array_equal(lag_matrix_loop(ads, lf_index, xlag, 1), lag_matrix(ads, lf_index, xlag, 1))
+
+        t_loop = min(timeit.repeat(lambda: lag_matrix_loop(ads, lf_index, xlag, 1), number=number, repeat=3))
+        t_vec = min(timeit.repeat(lambda: lag_matrix(ads, lf_index, xlag, 1), number=number, repeat=3))
+
+        print('{:>6} {:>12.3f} {:>12.3f} {:>7.1f}x'.format(xlag, 1e3 * t_loop / number, 1e3 * t_vec / number,
+                                                            t_loop / t_vec))
+
+
+if __name__ == '__main__':
+    main()
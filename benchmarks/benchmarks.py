@@ -0,0 +1,105 @@
+""" Throughput benchmarks for the MIDAS hot paths
+
+The classes follow asv's conventions (params, param_names, setup and time_ methods), so
+the suite runs under ``asv run``; ``python -m benchmarks`` runs it without asv.  Data
+are synthetic: a quarterly target with a monthly or daily regressor.  setup raises
+NotImplementedError to skip parameter combinations that don't make sense, such as
+500 monthly lags.
+"""
+import numpy as np
+
+from midas.adl import estimate, midas_adl
+from midas.fit import ssr, jacobian, jacobian_wx
+from midas.mix import MixDesign, mix_freq
+from midas.weights import polynomial_weights
+
+from .common import FREQUENCIES, make_mixed, make_arrays
+
+LAGS = [3, 22, 66, 260, 500]
+
+
+def _check_lags(hf, xlag):
+    # At most two years of high-frequency lags
+    if xlag > 8 * FREQUENCIES[hf][1]:
+        raise NotImplementedError
+
+
+class MixFreq(object):
+    params = [['monthly', 'daily'], LAGS]
+    param_names = ['hf', 'xlag']
+
+    def setup(self, hf, xlag):
+        _check_lags(hf, xlag)
+        self.y_in, self.x_in = make_mixed(40, hf)
+
+    def time_mix_freq(self, hf, xlag):
+        mix_freq(self.y_in, self.x_in, xlag, 1, 1)
+
+
+class Weights(object):
+    params = [['beta', 'expalmon'], LAGS]
+    param_names = ['poly', 'nlags']
+
+    def setup(self, poly, nlags):
+        self.weight_method = polynomial_weights(poly)
+        self.theta = np.array([1.5, 4.]) if poly == 'beta' else np.array([0.01, -0.001])
+        self.x, _, _ = make_arrays(200, nlags)
+
+    def time_x_weighted(self, poly, nlags):
+        self.weight_method.x_weighted(self.x, self.theta)
+
+    def time_jacobian_wx(self, poly, nlags):
+        jacobian_wx(self.x, self.theta, self.weight_method)
+
+
+class Residuals(object):
+    params = [['beta', 'expalmon'], LAGS]
+    param_names = ['poly', 'nlags']
+
+    def setup(self, poly, nlags):
+        self.weight_method = polynomial_weights(poly)
+        self.a = np.array([0.5, 0.2, 1.5, 4., 0.3] if poly == 'beta' else [0.5, 0.2, 0.01, -0.001, 0.3])
+        self.x, self.y, self.yl = make_arrays(200, nlags)
+
+    def time_ssr(self, poly, nlags):
+        ssr(self.a, self.x, self.y, self.yl, self.weight_method)
+
+    def time_jacobian(self, poly, nlags):
+        jacobian(self.a, self.x, self.y, self.yl, self.weight_method)
+
+
+class Estimate(object):
+    params = [['monthly', 'daily'], LAGS, [False, True]]
+    param_names = ['hf', 'xlag', 'profile']
+
+    def setup(self, hf, xlag, profile):
+        _check_lags(hf, xlag)
+        y_in, x_in = make_mixed(40, hf)
+        self.y, self.yl, self.x, _, _, _ = MixDesign(y_in, x_in, xlag, 1, 1).window()
+
+    def time_estimate(self, hf, xlag, profile):
+        estimate(self.y, self.yl, self.x, profile=profile)
+
+
+class Drivers(object):
+    params = [['fixed', 'rolling', 'recursive'], ['monthly', 'daily']]
+    param_names = ['method', 'hf']
+    timeout = 300
+
+    def setup(self, method, hf):
+        self.y_in, self.x_in = make_mixed(35, hf)
+        self.xlag = FREQUENCIES[hf][1]
+
+        # About 20 forecast windows; rolling windows are 100 quarters long
+        self.end_date = self.y_in.index[-21]
+        self.start_date = self.y_in.index[-121] if method == 'rolling' else self.y_in.index[4]
+
+    def time_midas_adl(self, method, hf):
+        midas_adl(self.y_in, self.x_in, self.start_date, self.end_date, self.xlag, 1, 1, method=method)
+
+
+class BatchDrivers(Drivers):
+    params = [['rolling', 'recursive'], ['monthly', 'daily']]
+
+    def time_midas_adl(self, method, hf):
+        midas_adl(self.y_in, self.x_in, self.start_date, self.end_date, self.xlag, 1, 1, method=method, batch=True)
@@ -0,0 +1,52 @@
+""" Synthetic data shared by the benchmarks
+"""
+import numpy as np
+import pandas as pd
+
+# High-frequency calendars, and the number of their periods in a quarter
+FREQUENCIES = {
+    'monthly': ('MS', 3),
+    'daily': ('B', 66),
+}
+
+
+def make_mixed(nyears, hf='monthly', seed=0):
+    """
+    Quarterly target and a high-frequency regressor, where the target depends on the
+    regressor's average over the previous quarter
+
+    Args:
+        nyears (int): Length of the sample
+        hf (str): 'monthly' or 'daily'
+        seed (int): Random seed
+
+    Returns:
+        (Series, Series): Quarterly target and high-frequency regressor
+    """
+    rng = np.random.default_rng(seed)
+    freq, per_quarter = FREQUENCIES[hf]
+
+    hf_index = pd.date_range('1960-01-01', periods=4 * per_quarter * nyears, freq=freq)
+    x_in = pd.Series(rng.normal(size=len(hf_index)), index=hf_index, name='x')
+
+    lf_index = pd.date_range('1960-01-01', hf_index[-1], freq='QS')
+    signal = x_in.rolling(per_quarter).mean().shift(1).reindex(lf_index, method='ffill')
+    y_in = (0.5 + 2. * signal + 0.3 * rng.normal(size=len(lf_index))).rename('y').dropna()
+
+    return y_in, x_in
+
+
+def make_arrays(nobs, nlags, seed=0):
+    """
+    Random lag matrix, target and one column of target lags
+
+    Returns:
+        (array, array, array): x, y, yl
+    """
+    rng = np.random.default_rng(seed)
+
+    x = rng.normal(size=(nobs, nlags))
+    yl = rng.normal(size=(nobs, 1))
+    y = rng.normal(size=nobs)
+
+    return x, y, yl
@@ -1,89 +1,506 @@
+import functools
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
-from scipy.optimize import least_squares
+from scipy.linalg import solve_triangular
+from scipy.optimize import least_squares, OptimizeResult
 
 from midas.weights import polynomial_weights
 
-from .mix import mix_freq
-from .fit import ssr, jacobian
+from .instrument import Instrument, stage
+from .cache import FitCache
+from .batch import estimate_batch
+from .result import FitResult
+from .mix import mix_freq, calculate_lags, hf_series, MixDesign
+from .fit import (ssr, jacobian, profile_factors, profile_ssr, profile_jacobian, linear_params, linear_weights_params,
+                  regressors, pack_params, unpack_params, pack_linear_weights, qr_append, grid_ssr, SOLVER_OPTIONS)
 
 
-def estimate(y, yl, x, poly='beta'):
+def estimate(y, yl, x, poly='beta', x0=None, profile=False, ridge=None, instrument=None, cache=None, multistart=None,
+             compact=False):
     """
     Fit MIDAS model
 
     Args:
        y (Series): Low-frequency data
        yl (DataFrame): Lags of low-frequency data
-       x (DataFrame): High-frequency regressors
+       x (DataFrame): High-frequency lags.  Lags of several regressors are stacked side by
+           side with (regressor, lag) MultiIndex columns, as returned by mix_freq.
+       poly (str or list): Weighting polynomial, or one for each regressor
+       x0 (array): Starting parameters, e.g. the solution for a neighbouring window.  If the
+           optimizer fails from x0 the fit is repeated from the usual OLS starting point.
+       profile (bool): Concentrate out the intercept, slope and y lag parameters, which have
+           an OLS solution for fixed weights, and optimize only over the weight parameters.
+           The result's x still holds the full parameter vector, so it can be passed to forecast.
+           An evaluation costs about as much as one of the full fit, so this pays off when it
+           takes fewer of them, as with beta weights on few lags or exponential Almon weights on
+           hundreds; where both converge in a few dozen it can be up to 1.5x slower.
+       ridge (float): Penalty on the squared weight parameters, for linear weights ('almon', 'umidas')
+       instrument (Instrument): Record the time of the OLS initialization and each optimizer run
+       cache (FitCache): Return the stored result of an identical earlier fit, and store new ones
+       multistart (int): Instead of the single default start, evaluate the sum of squared
+           residuals over the weight method's theta_grid, with the linear parameters at their
+           OLS values, and refine this many of the best candidates with the optimizer.  The
+           best refinement is returned, with nfev and njev counting all of them.
+       compact (bool): Return a FitResult, which keeps the parameters and statistics but
+           recomputes the residuals and Jacobian on demand
+
+    Linear weights are fitted by a single least-squares solve rather than the optimizer;
+    x0, profile and multistart don't apply to them.
 
     Returns:
-        scipy.optimize.OptimizeResult
+        scipy.optimize.OptimizeResult, or FitResult if compact
     """
+    y_v, yl_v, x_v = y.values, yl.values if yl is not None else None, x.values
+    weight_method = _weight_method(poly, x)
+
+    return estimate_array(y_v, yl_v, x_v, weight_method, x0=x0, profile=profile, ridge=ridge, instrument=instrument,
+                          cache=cache, multistart=multistart, compact=compact)
+
+
+def estimate_array(y_v, yl_v, x_v, weight_method, x0=None, profile=False, ridge=None, instrument=None, cache=None,
+                   multistart=None, compact=False):
+    """
+    Fit MIDAS model on plain arrays; the array-level counterpart of estimate, which
+    skips the pandas conversions when fitting many windows
+
+    Args:
+       y_v (array): Low-frequency data
+       yl_v (array): nobs x ylag lags of low-frequency data, or None
+       x_v (array): nobs x nlags high-frequency lags
+       weight_method (WeightMethod): Weighting polynomial, e.g. from polynomial_weights
+       x0 (array): Starting parameters, as for estimate
+       profile (bool): Concentrate out the linear parameters, as for estimate
+       ridge (float): Penalty on the squared weight parameters, for linear weights
+       instrument (Instrument): Record the stages of the fit, as for estimate
+       cache (FitCache): Memoize the fit, as for estimate
+       multistart (int): Number of grid candidates to refine, as for estimate
+       compact (bool): Return a FitResult, as for estimate
+
+    Returns:
+        scipy.optimize.OptimizeResult, or FitResult if compact
+    """
+    if compact:
+        res = estimate_array(y_v, yl_v, x_v, weight_method, x0=x0, profile=profile, ridge=ridge, instrument=instrument,
+                             cache=cache, multistart=multistart)
+
+        return FitResult.from_optimize(res, weight_method, (y_v, yl_v, x_v, weight_method))
+
+    if cache is not None:
+        key = FitCache.key(y_v, yl_v, x_v, weight_method, x0=x0, profile=profile, ridge=ridge, multistart=multistart,
+                           **SOLVER_OPTIONS)
+        with stage(instrument, 'cache') as info:
+            opt_res = cache.get(key)
+            if instrument is not None:
+                info.update(hit=opt_res is not None)
+
+        if opt_res is None:
+            opt_res = estimate_array(y_v, yl_v, x_v, weight_method, x0=x0, profile=profile, ridge=ridge,
+                                     instrument=instrument, multistart=multistart)
+            cache.put(key, opt_res)
+
+        return opt_res
+
+    if weight_method.linear:
+        with stage(instrument, 'solve'):
+            params = linear_weights_params(x_v, y_v, yl_v, weight_method, ridge)
+            resid = ssr(params, x_v, y_v, yl_v, weight_method)
+
+        return OptimizeResult(x=params, fun=resid, cost=0.5 * np.dot(resid, resid), nfev=1, njev=0, status=1,
+                              success=True, message='Linear least-squares solution')
+
+    if ridge is not None:
+        raise ValueError('ridge only applies to linear weights')
+
+    if profile:
+        last = [None, None]
+
+        def factors(v):
+            # least_squares asks for the residuals and then the Jacobian at each accepted point, and
+            # the linear parameters are wanted at the solution: factor the design once for all three
+            if last[0] is None or not np.array_equal(last[0], v):
+                last[:] = [np.array(v), profile_factors(v, x_v, yl_v, weight_method)]
+
+            return last[1]
+
+        def fun(v):
+            return profile_ssr(v, x_v, y_v, yl_v, weight_method, factors(v))
+
+        def jac(v):
+            return profile_jacobian(v, x_v, y_v, yl_v, weight_method, factors(v))
+    else:
+        def fun(v):
+            return ssr(v, x_v, y_v, yl_v, weight_method)
+
+        def jac(v):
+            return jacobian(v, x_v, y_v, yl_v, weight_method)
+
+    def solve(start, warm=False):
+        with stage(instrument, 'optimize', warm=warm) as info:
+            opt_res = least_squares(fun,
+                                    start,
+                                    jac,
+                                    verbose=0,
+                                    **SOLVER_OPTIONS)
+            if profile:
+                c = linear_params(opt_res.x, x_v, y_v, yl_v, weight_method, factors(opt_res.x))
+                opt_res.x = pack_params(c, opt_res.x, weight_method)
+
+            if instrument is not None:
+                info.update(nfev=opt_res.nfev, njev=opt_res.njev, status=opt_res.status, success=opt_res.success)
+
+        return opt_res
+
+    if x0 is not None:
+        try:
+            opt_res = solve(unpack_params(x0, weight_method)[2] if profile else x0, warm=True)
+        except ValueError:
+            opt_res = None
+        if opt_res is not None and opt_res.success:
+            return opt_res
+
+        # Fall back to the usual start, counting the evaluations of the failed warm start
+        cold = estimate_array(y_v, yl_v, x_v, weight_method, profile=profile, instrument=instrument,
+                              multistart=multistart)
+        if opt_res is not None:
+            cold.nfev += opt_res.nfev
+            cold.njev += opt_res.njev
 
-    weight_method = polynomial_weights(poly)
+        return cold
 
-    xw, w = weight_method.x_weighted(x, weight_method.init_params())
+    if multistart:
+        with stage(instrument, 'search') as info:
+            grid = weight_method.theta_grid(x_v.shape[1])
+            seeds = grid[np.argsort(grid_ssr(grid, x_v, y_v, yl_v, weight_method), kind='stable')[:multistart]]
 
-    # First we do OLS to get initial parameters
-    c = np.linalg.lstsq(np.concatenate([np.ones((len(xw), 1)), xw.reshape((len(xw), 1)), yl], axis=1), y)[0]
+            if instrument is not None:
+                info.update(candidates=len(grid))
 
-    def fun(v):
-        return ssr(v, x.values, y.values, yl.values, weight_method)
+        results = [solve(theta if profile else pack_params(linear_params(theta, x_v, y_v, yl_v, weight_method), theta,
+                                                           weight_method))
+                   for theta in seeds]
 
-    def jac(v):
-        return jacobian(v, x.values, y.values, yl.values, weight_method)
+        opt_res = min(results, key=lambda r: r.cost)
+        opt_res.nfev = sum(r.nfev for r in results)
+        opt_res.njev = sum(r.njev for r in results)
 
-    opt_res = least_squares(fun,
-                            np.concatenate([c[0:2], weight_method.init_params(), c[2:]]),
-                            jac,
-                            xtol=1e-9,
-                            ftol=1e-9,
-                            max_nfev=5000,
-                            verbose=0)
+        return opt_res
 
-    return opt_res
+    if profile:
+        return solve(weight_method.init_params())
 
+    with stage(instrument, 'init'):
+        xw = weight_method.x_weighted(x_v, weight_method.init_params())
 
-def forecast(xfc, yfcl, res, poly='beta'):
+        # First we do OLS to get initial parameters
+        c = np.linalg.lstsq(regressors(xw, yl_v), y_v, rcond=None)[0]
+
+    return solve(pack_params(c, weight_method.init_params(), weight_method))
+
+
+def forecast(xfc, yfcl, res, poly='beta', instrument=None):
     """
     Use the results of MIDAS regression to forecast new periods
     """
-    weight_method = polynomial_weights(poly)
+    yf = forecast_array(xfc.values, yfcl.values if yfcl is not None else None, res.x, _weight_method(poly, xfc),
+                        instrument=instrument)
 
-    a, b, theta1, theta2, lags = res.x
+    return pd.DataFrame(yf, index=xfc.index, columns=['yfh'])
 
-    xw, w = weight_method.x_weighted(xfc.values, [theta1, theta2])
 
-    yf = a + b * xw + lags * yfcl.values[:, 0]
+def forecast_array(xf, ylf, params, weight_method, instrument=None):
+    """
+    Forecast from plain arrays; the array-level counterpart of forecast
 
-    return pd.DataFrame(yf, index=xfc.index, columns=['yfh'])
+    Args:
+        xf (array): High-frequency lags of the forecast periods
+        ylf (array): Lags of low-frequency data for the forecast periods, or None
+        params (array): Fitted parameters, the x of estimate's result
+        weight_method (WeightMethod): Weighting polynomial the parameters were fitted with
+        instrument (Instrument): Record the time taken as the 'forecast' stage
+
+    Returns:
+        array: Forecasts
+    """
+    with stage(instrument, 'forecast'):
+        a, b, theta, lags = unpack_params(params, weight_method)
+
+        xw = weight_method.x_weighted(xf, theta)
+
+        yf = a + np.dot(xw.reshape((len(xw), -1)), b)
+        if ylf is not None:
+            yf += np.dot(ylf, lags)
+
+    return yf
+
+
+def _weight_method(poly, x):
+    """
+    Weight method for the lag matrix x: a single polynomial, or a StackedWeights with one
+    polynomial per regressor when x has (regressor, lag) columns
+    """
+    if not isinstance(x.columns, pd.MultiIndex):
+        return polynomial_weights(poly, x.shape[1])
+
+    regressor = x.columns.get_level_values(0)
+
+    return polynomial_weights(poly, [int((regressor == name).sum()) for name in regressor.unique()])
+
+
+def midas_adl(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta', method='fixed',
+              n_jobs=1, executor=None, warm_start=False, batch=False, instrument=None, return_params=False,
+              **kwargs):
+    """
+    Fit a MIDAS-ADL model and evaluate its forecasts
+
+    Args:
+        y_in (Series): Low-frequency dependent variable
+        x_in (Series): High-frequency regressor
+        start_date: Date on which to start estimation
+        end_date: Date on which to end (first) estimation
+        xlag (int or str): Number of high frequency lags
+        ylag (int or str): Number of low-frequency lags
+        horizon (int):
+        forecast_horizon (int): Forecast horizon evaluated by rolling and recursive
+        poly (str): Weighting polynomial
+        method (str): 'fixed', 'rolling' or 'recursive'
+        n_jobs (int): Number of worker processes used to fit rolling/recursive windows; -1 uses all cores
+        executor (concurrent.futures.Executor): Fit windows on this executor instead
+        warm_start (bool): Start each rolling/recursive window's optimizer from the previous window's solution
+        batch (bool): Fit the rolling/recursive windows together with estimate_batch
+        instrument (Instrument): Record the time spent aligning, initializing, optimizing and
+            forecasting, with the optimizer's statistics and the number of windows
+        return_params (bool): Also return the fitted parameters, one row per window
+        **kwargs: Passed to estimate, e.g. profile=True, or cache=FitCache(path) to reuse the fits
+            of windows whose data are unchanged since an earlier run; and lazy=True to rolling
+            and recursive
 
+    Returns:
+        rmse (float64), predicted and target values (DataFrame), and with return_params the
+        windows x parameters array of estimates
+    """
+    with stage(instrument, 'backtest', method=method) as info:
+        if method == 'fixed':
+            result = fixed_window(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon, poly,
+                                  instrument=instrument, return_params=return_params, **kwargs)
+        else:
+            methods = {'rolling': rolling,
+                       'recursive': recursive}
 
-def midas_adl(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta', method='fixed'):
-    methods = {'fixed': fixed_window,
-               'rolling': rolling,
-               'recursive': recursive}
+            result = methods[method](y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon, poly,
+                                     n_jobs=n_jobs, executor=executor, warm_start=warm_start, batch=batch,
+                                     instrument=instrument, return_params=return_params, **kwargs)
 
-    return methods[method](y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon, poly)
+        if instrument is not None:
+            info['windows'] = 1 if method == 'fixed' else len(result[1].index.unique(level=0))
 
+    return result
 
-def fixed_window(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta'):
+
+def fixed_window(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta',
+                 instrument=None, return_params=False, **kwargs):
 
     y, yl, x, yf, ylf, xf = mix_freq(y_in, x_in, xlag, ylag, horizon,
                                      start_date=start_date,
-                                     end_date=end_date)
+                                     end_date=end_date,
+                                     instrument=instrument)
+
+    res = estimate(y, yl, x, poly=poly, instrument=instrument, **kwargs)
 
-    res = estimate(y, yl, x, poly=poly)
+    fc = forecast(xf, ylf, res, poly=poly, instrument=instrument)
 
-    fc = forecast(xf, ylf, res, poly=poly)
+    result = (rmse(fc.yfh, yf),
+              pd.DataFrame({'preds': fc.yfh, 'targets': yf}, index=yf.index))
 
-    return (rmse(fc.yfh, yf),
-            pd.DataFrame({'preds': fc.yfh, 'targets': yf}, index=yf.index))
+    if return_params:
+        return result + (res.x.reshape((1, -1)),)
 
+    return result
 
-def rolling(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta'):
+
+def midas_batch(y_in, x_in, start_date, end_date, xlag, ylag, horizon, poly='beta', n_jobs=1, executor=None,
+                **kwargs):
+    """
+    Fit the same fixed-window MIDAS-ADL model to many low-frequency targets
+
+    The high-frequency regressor is aligned once and the lag matrix is shared by all
+    targets; each target only adds its own low-frequency lags.  Estimation runs from the
+    first to the last date on which a target and its lags are observed, and the rmse is
+    taken over the forecasts whose targets are observed.  A target with missing values
+    between those dates is an error.
+
+    Args:
+        y_in (DataFrame): Low-frequency targets, one per column, on a common index
+        x_in (Series): High-frequency regressor
+        start_date: Date on which to start estimation
+        end_date: Date on which to end estimation
+        xlag (int or str): Number of high frequency lags
+        ylag (int or str): Number of low-frequency lags
+        horizon (int):
+        poly (str): Weighting polynomial
+        n_jobs (int): Number of worker processes; -1 uses all cores
+        executor (concurrent.futures.Executor): Fit targets on this executor instead
+        **kwargs: Passed to estimate
+
+    Returns:
+        DataFrame: One row per target with the estimated parameters, the in-sample sum of
+        squared residuals, number of observations, function evaluations and the rmse of
+        the forecasts after end_date
+    """
+    design = MixDesign(y_in.iloc[:, 0], x_in, xlag, ylag, horizon)
+    start, stop = design.locate(start_date, end_date)
+
+    fit = functools.partial(_fit_target, start=start, stop=stop, poly=poly, estimate_kwargs=kwargs)
+    designs = [design.retarget(y_in[name]) for name in y_in.columns]
+
+    results = _map(fit, designs, n_jobs, executor)
+
+    names = param_names(polynomial_weights(poly, design.xlag), design.ylag, design.names)
+
+    return pd.DataFrame([np.concatenate([params, stats]) for params, stats in results],
+                        index=y_in.columns,
+                        columns=names + ['ssr', 'nobs', 'nfev', 'rmse'])
+
+
+def midas_select(y_in, x_in, start_date, end_date, xlags, ylags, horizon, polys=('beta', 'expalmon'),
+                 criterion='bic', n_jobs=1, executor=None, **kwargs):
+    """
+    Fit a grid of fixed-window MIDAS-ADL models and rank them by an information criterion
+
+    The data are aligned once for the largest lags and every smaller model uses the
+    leading columns of that design, so all models are estimated on the same sample
+    and their information criteria are comparable.
+
+    Args:
+        y_in (Series): Low-frequency dependent variable
+        x_in (Series, DataFrame or list of Series): High-frequency regressor(s)
+        start_date: Date on which to start estimation
+        end_date: Date on which to end estimation
+        xlags (list): Numbers of high frequency lags (int or str) to try.  With several
+            regressors, each is a tuple with one number per regressor, or a number for all
+        ylags (list): Numbers of low-frequency lags (int or str) to try
+        horizon (int):
+        polys (list): Weighting polynomials to try
+        criterion (str): 'aic', 'bic' or 'rmse' (of the forecasts after end_date)
+        n_jobs (int): Number of worker processes; -1 uses all cores
+        executor (concurrent.futures.Executor): Fit models on this executor instead
+        **kwargs: Passed to estimate
+
+    Returns:
+        DataFrame: One row per model, best first, with the sum of squared residuals,
+        number of observations and parameters, AIC, BIC and forecast rmse
+    """
+    hf_list = hf_series(x_in)
+    if len(hf_list) == 1:
+        xlags = sorted(set(calculate_lags(lag, hf_list[0]) for lag in xlags))
+        max_xlag = xlags[-1]
+    else:
+        xlags = sorted(set(_regressor_lags(lag, hf_list) for lag in xlags))
+        max_xlag = [max(lags) for lags in zip(*xlags)]
+    ylags = sorted(set(calculate_lags(lag, y_in) for lag in ylags))
+
+    design = MixDesign(y_in, x_in, max_xlag, ylags[-1], horizon)
+    start, stop = design.locate(start_date, end_date)
+
+    grid = list(itertools.product(xlags, ylags, polys))
+    fit = functools.partial(_fit_model, design, start=start, stop=stop, estimate_kwargs=kwargs)
+
+    results = pd.DataFrame(_map(fit, grid, n_jobs, executor),
+                           columns=['xlag', 'ylag', 'poly', 'ssr', 'nobs', 'nparams', 'rmse'])
+
+    results['aic'] = results.nobs * np.log(results.ssr / results.nobs) + 2 * results.nparams
+    results['bic'] = results.nobs * np.log(results.ssr / results.nobs) + np.log(results.nobs) * results.nparams
+
+    return results.sort_values(criterion, kind='stable').reset_index(drop=True)
+
+
+def _regressor_lags(xlag, hf_list):
+    """
+    Numbers of lags of each regressor, as a tuple, from one number or one per regressor
+    """
+    xlags = xlag if isinstance(xlag, (list, tuple)) else [xlag] * len(hf_list)
+    if len(xlags) != len(hf_list):
+        raise ValueError('Expected {} lags, one per regressor, got {!r}'.format(len(hf_list), xlag))
+
+    return tuple(calculate_lags(lag, hf) for lag, hf in zip(xlags, hf_list))
+
+
+def _fit_model(design, spec, start=0, stop=None, estimate_kwargs=None):
+    xlag, ylag, poly = spec
+
+    design = design.subset(xlag, ylag)
+    weight_method = polynomial_weights(poly, design.xlag)
+
+    y, yl, x, yf, ylf, xf = design.iarrays(start, stop)
+
+    res = estimate_array(y, yl, x, weight_method, **(estimate_kwargs or {}))
+
+    fc = forecast_array(xf, ylf, res.x, weight_method)
+
+    # The slopes of linear weights are fixed, not estimated
+    nparams = len(res.x) - (weight_method.num_regressors if weight_method.linear else 0)
+
+    return xlag, ylag, poly, 2 * res.cost, len(y), nparams, rmse(fc, yf)
+
+
+def param_names(weight_method, ylag, names=None):
+    """
+    Names of the MIDAS-ADL parameters, in the order used by estimate
+
+    Args:
+        weight_method (WeightMethod): Weight method of the model
+        ylag (int): Number of low-frequency lags
+        names (list): Names of the high-frequency regressors, for models with several
+    """
+    if names is None:
+        slopes = ['b']
+        thetas = ['theta{}'.format(i + 1) for i in range(weight_method.num_params)]
+    else:
+        slopes = ['b_{}'.format(name) for name in names]
+        thetas = []
+        counts = np.zeros(len(names), dtype=int)
+        for r in weight_method.param_regressor:
+            counts[r] += 1
+            thetas.append('theta{}_{}'.format(counts[r], names[r]))
+
+    return ['a'] + slopes + thetas + ['lag{}'.format(i + 1) for i in range(ylag)]
+
+
+def _fit_target(design, start=0, stop=None, poly='beta', estimate_kwargs=None):
+    estimate_kwargs = estimate_kwargs or {}
+
+    observed = design.y.notnull().values
+    if design.yl is not None:
+        observed = observed & design.yl.notnull().all(axis=1).values
+    stop = len(observed) if stop is None else stop
+
+    # Fit from the first to the last date on which the target and its lags are observed
+    rows = start + np.flatnonzero(observed[start:stop])
+    if not len(rows):
+        raise ValueError('{} has no observations in the estimation window'.format(design.y.name))
+    if rows[-1] - rows[0] + 1 != len(rows):
+        raise ValueError('{} has missing values inside the estimation window'.format(design.y.name))
+
+    weight_method = polynomial_weights(poly, design.xlag)
+
+    y, yl, x = design.iarrays(rows[0], rows[-1] + 1)[:3]
+    yf, ylf, xf = design.iarrays(start, stop)[3:]
+
+    res = estimate_array(y, yl, x, weight_method, **estimate_kwargs)
+
+    fc = forecast_array(xf, ylf, res.x, weight_method)
+    scored = observed[stop:]
+
+    return res.x, [2 * res.cost, len(y), res.nfev, rmse(fc[scored], yf[scored]) if scored.any() else np.nan]
+
+
+def rolling(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta',
+            n_jobs=1, executor=None, warm_start=False, batch=False, instrument=None, lazy=False,
+            return_params=False, **kwargs):
     """
     Make a series of forecasts using a fixed-size "rolling window" to fit the
     model
@@ -94,73 +511,389 @@ def rolling(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_hori
         start_date: Initial start date for window
         window_size: Number of periods in window
         max_horizon: Maximum horizon to forecast
+        n_jobs (int): Number of worker processes; -1 uses all cores
+        executor (concurrent.futures.Executor): Fit windows on this executor instead
+        forecast_horizon (int or list): Horizon to forecast, or several to forecast from every window
+        warm_start (bool): Start each window's optimizer from the previous window's solution
+        batch (bool): Fit the windows together with estimate_batch, a vectorized
+            Levenberg-Marquardt solver, instead of one least_squares run each
+        instrument (Instrument): Record the stages of the alignment and of each window's fit
+        lazy (bool): Weight the regressor by convolving the high-frequency series instead of
+            building the lag matrix (see MixDesign); for a single regressor with many lags
+        return_params (bool): Also return the parameters fitted to each window
+        **kwargs: Passed to estimate
 
     Returns:
-        rmse (float64), predicted and target values (DataFrame)
+        rmse (float64), predicted and target values (DataFrame) with the number of
+        function evaluations used to fit each window.  With several horizons, the rmse
+        of each (Series) and the values by origin and horizon; see _evaluate_windows.  With
+        return_params, also the windows x parameters array of estimates, in window order.
 
     """
-    preds = []
-    targets = []
-    dt_index = []
     start_loc = y_in.index.get_loc(start_date)
     window_size = 60
     if end_date is not None:
         end_loc = y_in.index.get_loc(end_date)
         window_size = end_loc - start_loc
 
-    while start_loc + window_size < (len(y_in.index) - forecast_horizon):
-        y, yl, x, yf, ylf, xf = mix_freq(y_in, x_in, xlag, ylag, horizon,
-                                         start_date=y_in.index[start_loc],
-                                         end_date=y_in.index[start_loc + window_size])
-        if len(xf) - forecast_horizon <= 0:
-            break
+    with stage(instrument, 'align'):
+        design = MixDesign(y_in, x_in, xlag, ylag, horizon, lazy=lazy)
 
-        res = estimate(y, yl, x)
+    # Windows for the shortest horizon; longer ones use the leading windows that have targets
+    min_horizon = int(np.min(forecast_horizon))
 
-        fc = forecast(xf, ylf, res)
+    windows = []
+    limits = []
+    while start_loc + window_size < (len(y_in.index) - min_horizon):
+        start, stop = design.locate(start_date=y_in.index[start_loc],
+                                    end_date=y_in.index[start_loc + window_size])
+        if len(design) - stop - min_horizon <= 0:
+            break
 
-        preds.append(fc.iloc[forecast_horizon - 1].values[0])
-        targets.append(yf.iloc[forecast_horizon - 1])
-        dt_index.append(yf.index[forecast_horizon - 1])
+        windows.append((start, stop))
+        limits.append(min(len(y_in.index) - start_loc - window_size, len(design) - stop))
 
         start_loc += 1
 
-    preds = np.array(preds)
-    targets = np.array(targets)
+    return _evaluate_windows(design, windows, forecast_horizon, poly, n_jobs, executor, warm_start, kwargs,
+                             instrument, limits, batch, return_params)
 
-    return (rmse(preds, targets),
-            pd.DataFrame({'preds': preds, 'targets': targets}, index=pd.DatetimeIndex(dt_index)))
 
+def recursive(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta',
+              n_jobs=1, executor=None, warm_start=False, batch=False, instrument=None, lazy=False,
+              return_params=False, **kwargs):
+    """
+    Make a series of forecasts using an expanding window that always starts at
+    start_date to fit the model
 
-def recursive(y_in, x_in, start_date, end_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta'):
-    preds = []
-    targets = []
-    dt_index = []
+    Args:
+        y_in (Series): Dependent variable
+        x_in (Series): Independent variables
+        start_date: Start date for every window
+        end_date: End date of the first window
+        n_jobs (int): Number of worker processes; -1 uses all cores
+        executor (concurrent.futures.Executor): Fit windows on this executor instead
+        forecast_horizon (int or list): Horizon to forecast, or several to forecast from every window
+        warm_start (bool): Start each window's optimizer from the previous window's solution
+        batch (bool): Fit the windows together with estimate_batch, a vectorized
+            Levenberg-Marquardt solver, instead of one least_squares run each
+        instrument (Instrument): Record the stages of the alignment and of each window's fit
+        lazy (bool): Weight the regressor by convolving the high-frequency series instead of
+            building the lag matrix (see MixDesign); for a single regressor with many lags
+        return_params (bool): Also return the parameters fitted to each window
+        **kwargs: Passed to estimate
 
+    Returns:
+        rmse (float64), predicted and target values (DataFrame) with the number of
+        function evaluations used to fit each window.  With several horizons, the rmse
+        of each (Series) and the values by origin and horizon; see _evaluate_windows.  With
+        return_params, also the windows x parameters array of estimates, in window order.
+    """
     forecast_start_loc = y_in.index.get_loc(end_date)
 
-    model_end_dates = y_in.index[forecast_start_loc:-forecast_horizon]
+    # Windows for the shortest horizon; longer ones use the leading windows that have targets
+    min_horizon = int(np.min(forecast_horizon))
+
+    model_end_dates = y_in.index[forecast_start_loc:-min_horizon]
+
+    with stage(instrument, 'align'):
+        design = MixDesign(y_in, x_in, xlag, ylag, horizon, lazy=lazy)
 
-    for estimate_end in model_end_dates:
-        y, yl, x, yf, ylf, xf = mix_freq(y_in, x_in, xlag, ylag, horizon,
-                                         start_date=start_date,
-                                         end_date=estimate_end)
-        if len(xf) - forecast_horizon <= 0:
+    windows = []
+    limits = []
+    for end_loc, estimate_end in enumerate(model_end_dates, forecast_start_loc):
+        start, stop = design.locate(start_date=start_date, end_date=estimate_end)
+        if len(design) - stop - min_horizon <= 0:
             break
 
-        res = estimate(y, yl, x)
+        windows.append((start, stop))
+        limits.append(min(len(y_in.index) - end_loc, len(design) - stop))
 
-        fc = forecast(xf, ylf, res)
+    return _evaluate_windows(design, windows, forecast_horizon, poly, n_jobs, executor, warm_start, kwargs,
+                             instrument, limits, batch, return_params)
 
-        preds.append(fc.iloc[forecast_horizon - 1].values[0])
-        targets.append(yf.iloc[forecast_horizon - 1])
-        dt_index.append(yf.index[forecast_horizon - 1])
 
-    preds = np.array(preds)
-    targets = np.array(targets)
+def _evaluate_windows(design, windows, forecast_horizon, poly, n_jobs=1, executor=None, warm_start=False,
+                      estimate_kwargs=None, instrument=None, limits=None, batch=False, return_params=False):
+    """
+    Fit each (start, stop) window of the design and forecast forecast_horizon periods past it
+
+    With a list of horizons each window is fitted once and forecast at every horizon h
+    with h < limits[i], which keeps the windows of each horizon the same as in a run for
+    that horizon alone.  The rmse is then a Series by horizon, and the values are indexed
+    by origin (the window's last estimation date) and horizon, with the target date as a
+    column; unstack the preds to get an origin x horizon table.
+
+    With return_params the parameters of every window are returned as a third value, a
+    C-contiguous windows x parameters array rather than a result object per window.
+
+    Windows are independent, so they are fanned out to executor (or a process pool of
+    n_jobs workers) when one is given.  With warm_start the windows are split into one
+    contiguous block per worker (of the executor, if it is given) instead, and each block
+    is fitted in order so every window can start from its predecessor's solution.  Linear weights are blocked the same
+    way, so expanding windows can update one QR factorization (see backtest_array), and
+    so are batch fits, which solve each block's windows together.
+    Results are collected in window order either way, as are the records for
+    instrument, which the workers pass back.
+    """
+    if warm_start or batch or polynomial_weights(poly, design.xlag).linear:
+        nblocks = _num_workers(n_jobs, executor)
+        blocks = [[tuple(w) for w in b] for b in np.array_split(np.array(windows, dtype=int), nblocks) if len(b)]
+    else:
+        blocks = [[w] for w in windows]
+
+    fit = functools.partial(_fit_block, design, forecast_horizon=forecast_horizon, poly=poly, warm_start=warm_start,
+                            batch=batch, estimate_kwargs=estimate_kwargs, instrumented=instrument is not None)
+
+    results = _map(fit, blocks, n_jobs, executor)
+
+    if instrument is not None:
+        for r in results:
+            instrument.extend(r[3])
+
+    preds = np.concatenate([r[0] for r in results]) if results else np.empty((0,) + np.shape(forecast_horizon))
+    targets = np.concatenate([r[1] for r in results]) if results else np.empty_like(preds)
+    nfev = np.concatenate([r[2] for r in results]).astype(int) if results else np.empty(0, dtype=int)
+
+    if return_params:
+        params = np.concatenate([r[4] for r in results]) if results else np.empty((0, 0))
+        return _evaluate_table(design, windows, forecast_horizon, limits, preds, targets, nfev) + (params,)
+
+    return _evaluate_table(design, windows, forecast_horizon, limits, preds, targets, nfev)
+
+
+def _evaluate_table(design, windows, forecast_horizon, limits, preds, targets, nfev):
+    """
+    rmse and table of predictions, targets and function evaluations of _evaluate_windows
+    """
+    horizons = np.atleast_1d(forecast_horizon)
+
+    if np.ndim(forecast_horizon) == 0:
+        dt_index = design.index[[stop + forecast_horizon - 1 for start, stop in windows]]
+
+        return (rmse(preds, targets),
+                pd.DataFrame({'preds': preds, 'targets': targets, 'nfev': nfev}, index=pd.DatetimeIndex(dt_index)))
+
+    window, column = np.nonzero(horizons[None, :] < np.asarray(limits, dtype=int).reshape(-1, 1))
+    stops = np.array([stop for start, stop in windows], dtype=int)
+
+    table = pd.DataFrame({'target_date': design.index[stops[window] + horizons[column] - 1],
+                          'preds': preds[window, column],
+                          'targets': targets[window, column],
+                          'nfev': nfev[window]},
+                         index=pd.MultiIndex.from_arrays([design.index[stops[window] - 1], horizons[column]],
+                                                         names=['origin', 'horizon']))
+
+    errors = (table.preds - table.targets) ** 2
+
+    return np.sqrt(errors.groupby(level='horizon').mean()), table
+
+
+def _fit_block(design, windows, forecast_horizon=1, poly='beta', warm_start=False, batch=False, estimate_kwargs=None,
+               instrumented=False):
+    y, yl, x = design.arrays()
+    instrument = Instrument() if instrumented else None
+
+    preds, targets, nfev, params = backtest_array(y, yl, x, windows, polynomial_weights(poly, design.xlag),
+                                                  forecast_horizon=forecast_horizon, warm_start=warm_start,
+                                                  batch=batch, instrument=instrument, return_params=True,
+                                                  **(estimate_kwargs or {}))
+
+    return preds, targets, nfev, instrument.records if instrumented else [], params
+
+
+def backtest_array(y, yl, x, windows, weight_method, forecast_horizon=1, warm_start=False, batch=False,
+                   instrument=None, return_params=False, **kwargs):
+    """
+    Fit each window of the arrays and forecast forecast_horizon periods past it; the
+    array-level loop behind rolling and recursive
+
+    Args:
+        y (array): Low-frequency data for every row of the design
+        yl (array): Lags of low-frequency data, or None
+        x (array): High-frequency lags
+        windows (list): (start, stop) row positions of each estimation window
+        weight_method (WeightMethod): Weighting polynomial
+        forecast_horizon (int or list): Forecast row stop + forecast_horizon - 1 of each window, or
+            those rows for several horizons
+        warm_start (bool): Start each window's optimizer from the previous window's solution
+        batch (bool): Fit all the windows together with estimate_batch; kwargs must be empty
+        instrument (Instrument): Record each window's stages
+        return_params (bool): Also return the windows x parameters array of estimates
+        **kwargs: Passed to estimate_array
+
+    With linear weights and expanding windows (a common start and non-decreasing stops,
+    as in recursive) the fits update a QR factorization with each window's new rows
+    instead of refitting, so each step costs the same however long the sample; a cache
+    in kwargs is not used then.
+
+    Returns:
+        (array, array, array): Predictions, targets and number of function evaluations,
+        one per window.  With several horizons the predictions and targets have a column
+        for each, NaN where the horizon's row is past the end of the data.  With return_params
+        the parameters follow, one row per window.
+    """
+    if weight_method.linear and _expanding(windows):
+        result = _backtest_updating(y, yl, x, windows, weight_method, forecast_horizon, kwargs.get('ridge'),
+                                    instrument)
+    elif batch and not weight_method.linear:
+        if kwargs:
+            raise ValueError('Batch fits take no estimate options ({})'.format(', '.join(sorted(kwargs))))
+
+        result = _backtest_batch(y, yl, x, windows, weight_method, forecast_horizon, instrument)
+    else:
+        result = _backtest_windows(y, yl, x, windows, weight_method, forecast_horizon, warm_start, instrument,
+                                   **kwargs)
+
+    return result if return_params else result[:3]
+
+
+def _backtest_windows(y, yl, x, windows, weight_method, forecast_horizon=1, warm_start=False, instrument=None,
+                      **kwargs):
+    """
+    backtest_array with one estimate_array call per window
+    """
+    preds = np.empty((len(windows),) + np.shape(forecast_horizon))
+    targets = np.empty_like(preds)
+    nfev = np.empty(len(windows), dtype=int)
+    params = np.empty((len(windows), _num_params(yl, weight_method)))
+    x0 = None
+
+    for i, (start, stop) in enumerate(windows):
+        with stage(instrument, 'window', start=int(start), stop=int(stop)):
+            res = estimate_array(y[start:stop], yl[start:stop] if yl is not None else None, x[start:stop],
+                                 weight_method, x0=x0, instrument=instrument, **kwargs)
+
+            preds[i], targets[i] = _forecast_rows(y, yl, x, stop, forecast_horizon, res.x, weight_method, instrument)
+            nfev[i] = res.nfev
+            params[i] = res.x
+
+        if warm_start:
+            x0 = res.x
+
+    return preds, targets, nfev, params
+
+
+def _num_params(yl, weight_method):
+    return 1 + weight_method.num_regressors + weight_method.num_params + (yl.shape[1] if yl is not None else 0)
+
+
+def _backtest_batch(y, yl, x, windows, weight_method, forecast_horizon=1, instrument=None):
+    """
+    backtest_array with the windows fitted together by estimate_batch
+    """
+    params, _, nfev, _ = estimate_batch(y, yl, x, windows, weight_method, instrument=instrument)
+
+    preds = np.empty((len(windows),) + np.shape(forecast_horizon))
+    targets = np.empty_like(preds)
+
+    for i, (start, stop) in enumerate(windows):
+        preds[i], targets[i] = _forecast_rows(y, yl, x, stop, forecast_horizon, params[i], weight_method, instrument)
+
+    return preds, targets, nfev, params
+
+
+def _forecast_rows(y, yl, x, stop, forecast_horizon, params, weight_method, instrument=None):
+    """
+    Forecasts and targets at rows stop + forecast_horizon - 1, NaN for rows past the data
+    """
+    rows = stop + np.atleast_1d(forecast_horizon) - 1
+    valid = rows < len(y)
+    rows = rows[valid]
+
+    preds = np.full(valid.shape, np.nan)
+    targets = np.full_like(preds, np.nan)
+
+    preds[valid] = forecast_array(x[rows], yl[rows] if yl is not None else None, params, weight_method,
+                                  instrument=instrument)
+    targets[valid] = y[rows]
+
+    if np.ndim(forecast_horizon) == 0:
+        return preds[0], targets[0]
+
+    return preds, targets
+
+
+def _expanding(windows):
+    starts = [start for start, stop in windows]
+    stops = [stop for start, stop in windows]
+
+    return len(set(starts)) == 1 and all(a <= b for a, b in zip(stops, stops[1:]))
+
+
+def _backtest_updating(y, yl, x, windows, weight_method, forecast_horizon=1, ridge=None, instrument=None):
+    """
+    backtest_array for linear weights and expanding windows
+
+    Keeps the triangular factor of [Z | y], Z = regressors(x_basis(x), yl), for the rows
+    fitted so far and appends each window's new rows to it with qr_append.  The
+    coefficients are then a triangular solve, matching linear_weights_params on the full
+    window; windows too short for a full-rank factor fall back to it.
+    """
+    z = regressors(weight_method.x_basis(x), yl)
+    zy = np.column_stack([z, y])
+    m = z.shape[1]
+    p = weight_method.num_params
+
+    r = np.zeros((m + 1, m + 1))
+    if ridge:
+        penalty = np.zeros((p, m + 1))
+        penalty[:, 1:1 + p] = np.sqrt(ridge) * np.eye(p)
+        r = qr_append(r, penalty)
+
+    preds = np.empty((len(windows),) + np.shape(forecast_horizon))
+    targets = np.empty_like(preds)
+    path = np.empty((len(windows), _num_params(yl, weight_method)))
+    added = windows[0][0] if len(windows) else 0
+
+    for i, (start, stop) in enumerate(windows):
+        with stage(instrument, 'window', start=int(start), stop=int(stop)):
+            r = qr_append(r, zy[added:stop])
+            added = stop
+
+            diag = np.abs(np.diag(r)[:m])
+            if diag.min() > m * np.finfo(float).eps * diag.max():
+                params = pack_linear_weights(solve_triangular(r[:m, :m], r[:m, m]), weight_method)
+            else:
+                params = linear_weights_params(x[start:stop], y[start:stop], yl[start:stop] if yl is not None else None,
+                                               weight_method, ridge)
+
+            preds[i], targets[i] = _forecast_rows(y, yl, x, stop, forecast_horizon, params, weight_method,
+                                                  instrument)
+            path[i] = params
+
+    return preds, targets, np.ones(len(windows), dtype=int), path
+
+
+def _map(fn, items, n_jobs=1, executor=None):
+    """
+    Apply fn to each of items, on executor or a pool of n_jobs processes if given, keeping order
+
+    A process pool pickles fn and the items with each chunk; lazy designs on memory-mapped
+    data pickle a reference to the file, other arrays are copied.
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if executor is not None:
+        return list(executor.map(fn, items))
+
+    if n_jobs > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            return list(pool.map(fn, items, chunksize=max(1, len(items) // (4 * n_jobs))))
+
+    return list(map(fn, items))
+
+
+def _num_workers(n_jobs=1, executor=None):
+    """
+    Number of tasks _map runs at once: the executor's workers if it is given, else n_jobs
+    """
+    if executor is not None:
+        # concurrent.futures executors don't expose their size publicly
+        return getattr(executor, '_max_workers', None) or os.cpu_count()
 
-    return (rmse(preds, targets),
-            pd.DataFrame({'preds': preds, 'targets': targets}, index=pd.DatetimeIndex(dt_index)))
+    return os.cpu_count() if n_jobs == -1 else max(1, n_jobs)
 
 
 def rmse(predictions, targets):
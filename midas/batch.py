@@ -0,0 +1,225 @@
+import numpy as np
+
+from .fit import unpack_params, SOLVER_OPTIONS
+from .instrument import stage
+
+# least_squares' default tolerance on the gradient
+_GTOL = 1e-8
+
+
+def estimate_batch(y, yl, x, windows, weight_method, instrument=None, xtol=SOLVER_OPTIONS['xtol'],
+                   ftol=SOLVER_OPTIONS['ftol'], max_nfev=SOLVER_OPTIONS['max_nfev']):
+    """
+    Fit the MIDAS model to many windows of the same design at once
+
+    Every window has the same parameters, so the fits are run side by side on stacked
+    arrays: the windows' rows are gathered into a windows x rows array (shorter windows
+    are padded with masked rows), the weighted regressors of all windows come from one
+    product of x with their stacked weights, and each iteration solves all the windows'
+    trust-region subproblems together.  Windows that have converged are dropped from
+    the stack, so later iterations only cost as much as the windows still moving.
+
+    Each window starts, like estimate, from the OLS fit for the weight method's initial
+    parameters, and takes the steps of least_squares' default 'trf' method without
+    bounds: the same trust region, radius updates and ftol, xtol and gtol tests.  Each
+    window therefore follows the path estimate_array would take, up to rounding.  Where
+    the sum of squares is nearly flat in the weight parameters (e.g. beta weights on
+    three lags) rounding can still send a window to a different local minimum than
+    estimate_array, better or worse, so the two are not guaranteed to agree there.
+    Only nonlinear weights for a single regressor are supported.
+
+    Args:
+        y (array): Low-frequency data for every row of the design
+        yl (array): Lags of low-frequency data, or None
+        x (array): High-frequency lags, or a LagOperator
+        windows (list): (start, stop) row positions of each estimation window
+        weight_method (WeightMethod): Weighting polynomial
+        instrument (Instrument): Record the fit as an 'optimize' stage, with the number of
+            windows and iterations
+        xtol (float): Tolerance on the relative change of the parameters
+        ftol (float): Tolerance on the relative change of the sum of squared residuals
+        max_nfev (int): Maximum number of function evaluations of each window
+
+    Returns:
+        (array, array, array, array): windows x parameters array of estimates, and the
+        cost (half the sum of squared residuals), number of function evaluations and
+        status of each window (as in least_squares: 1 converged by gtol, 2 by ftol, 3 by
+        xtol, 4 by both, 0 stopped at max_nfev)
+    """
+    if weight_method.linear or weight_method.num_regressors != 1:
+        raise ValueError('Batched estimation needs nonlinear weights for a single regressor')
+
+    windows = np.asarray(windows, dtype=int).reshape(-1, 2)
+    lengths = windows[:, 1] - windows[:, 0]
+
+    rows = windows[:, :1] + np.arange(lengths.max() if len(windows) else 0)
+    mask = rows < windows[:, 1:]
+    rows = np.where(mask, rows, windows[:, :1])
+
+    ys = np.where(mask, y[rows], 0.)
+    yls = np.where(mask[:, :, None], yl[rows], 0.) if yl is not None else np.zeros(rows.shape + (0,))
+
+    with stage(instrument, 'optimize', batch=True) as info:
+        params = _initial_params(x, ys, yls, rows, mask, weight_method)
+        resid, jac = _residuals(params, x, ys, yls, rows, mask, weight_method)
+        cost = 0.5 * (resid ** 2).sum(axis=1)
+
+        radius = np.linalg.norm(params, axis=1)
+        radius[radius == 0] = 1.
+        damping = np.zeros(len(windows))
+        nfev = np.ones(len(windows), dtype=int)
+        status = np.zeros(len(windows), dtype=int)
+        active = np.arange(len(windows))
+
+        iterations = 0
+        while len(active):
+            g = np.matmul(resid[active][:, None, :], jac[active])[:, 0, :]
+            status[active[np.abs(g).max(axis=1) < _GTOL]] = 1
+            moving = (status[active] == 0) & (nfev[active] < max_nfev)
+            active, g = active[moving], g[moving]
+            if not len(active):
+                break
+            iterations += 1
+
+            step, damping[active] = _trust_step(jac[active], resid[active], lengths[active], radius[active],
+                                                damping[active])
+            length = np.linalg.norm(step, axis=1)
+
+            trial = params[active] + step
+            trial_resid, trial_jac = _residuals(trial, x, ys[active], yls[active], rows[active], mask[active],
+                                                weight_method)
+            trial_cost = 0.5 * (trial_resid ** 2).sum(axis=1)
+            nfev[active] += 1
+
+            js = np.matmul(jac[active], step[:, :, None])[:, :, 0]
+            predicted = -(0.5 * (js ** 2).sum(axis=1) + (g * step).sum(axis=1))
+            reduction = cost[active] - trial_cost
+            finite = np.isfinite(trial_cost)
+
+            ratio = np.where(predicted > 0, reduction / np.where(predicted > 0, predicted, 1.),
+                             np.where((predicted == 0) & (reduction == 0), 1., 0.))
+            new_radius = np.where(ratio < 0.25, 0.25 * length,
+                                  np.where((ratio > 0.75) & (length > 0.95 * radius[active]), 2. * radius[active],
+                                           radius[active]))
+
+            converged_f = finite & (reduction < ftol * cost[active]) & (ratio > 0.25)
+            converged_x = finite & (length < xtol * (xtol + np.linalg.norm(params[active], axis=1)))
+            converged = converged_f | converged_x
+
+            # A non-finite trial only shrinks the trust region; otherwise the damping is rescaled with it
+            moved = finite & ~converged
+            damping[active[moved]] *= radius[active[moved]] / new_radius[moved]
+            radius[active] = np.where(finite, np.where(converged, radius[active], new_radius), 0.25 * length)
+
+            improved = finite & (reduction > 0)
+            accepted = active[improved]
+            params[accepted] = trial[improved]
+            resid[accepted] = trial_resid[improved]
+            jac[accepted] = trial_jac[improved]
+            cost[accepted] = trial_cost[improved]
+
+            # Converged windows leave the stack at the next gradient test, which takes precedence as in least_squares
+            status[active[converged]] = np.where(converged_f & converged_x, 4, np.where(converged_f, 2, 3))[converged]
+
+        if instrument is not None:
+            info.update(windows=len(windows), iterations=iterations, nfev=int(nfev.sum()), njev=int(nfev.sum()),
+                        status=int(status.min()) if len(status) else 0)
+
+    return params, cost, nfev, status
+
+
+def _trust_step(jac, resid, nobs, radius, damping, rtol=0.01, max_iter=10):
+    """
+    Steps of the windows within their trust regions, as least_squares' exact trust-region solver
+
+    Takes the Gauss-Newton step where the Jacobian has full rank and the step fits in the
+    trust region, and otherwise finds the Levenberg-Marquardt damping that puts the step
+    on its boundary by Moré's iteration, from the SVD of each window's Jacobian.
+
+    Args:
+        jac (array): windows x rows x parameters Jacobians
+        resid (array): windows x rows residuals
+        nobs (array): Number of unpadded rows of each window
+        radius (array): Trust region radius of each window
+        damping (array): Damping of each window's previous step, to start the iteration from
+
+    Returns:
+        (array, array): windows x parameters steps, and their damping
+    """
+    u, s, vt = np.linalg.svd(jac, full_matrices=False)
+    uf = np.matmul(u.transpose(0, 2, 1), resid[:, :, None])[:, :, 0]
+    suf = s * uf
+
+    full_rank = (nobs >= s.shape[1]) & (s[:, -1] > np.finfo(float).eps * nobs * s[:, 0])
+    gauss_newton = -np.matmul(vt.transpose(0, 2, 1), (uf / np.where(full_rank[:, None], s, 1.))[:, :, None])[:, :, 0]
+    done = full_rank & (np.linalg.norm(gauss_newton, axis=1) <= radius)
+
+    def phi_and_derivative(alpha):
+        denom = s ** 2 + alpha[:, None]
+        norm = np.linalg.norm(suf / denom, axis=1)
+        return norm - radius, -(suf ** 2 / denom ** 3).sum(axis=1) / norm
+
+    upper = np.linalg.norm(suf, axis=1) / radius
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi, phi_prime = phi_and_derivative(np.zeros(len(s)))
+        lower = np.where(full_rank, -phi / phi_prime, 0.)
+    lower = np.where(np.isfinite(lower), lower, 0.)
+
+    searching = ~done
+    alpha = np.where((damping == 0) & ~full_rank, np.maximum(0.001 * upper, np.sqrt(lower * upper)), damping)
+    for _ in range(max_iter):
+        if not searching.any():
+            break
+        reset = (alpha < lower) | (alpha > upper)
+        alpha = np.where(searching & reset, np.maximum(0.001 * upper, np.sqrt(lower * upper)), alpha)
+
+        phi, phi_prime = phi_and_derivative(alpha)
+        upper = np.where(searching & (phi < 0), alpha, upper)
+        ratio = phi / phi_prime
+        lower = np.where(searching, np.maximum(lower, alpha - ratio), lower)
+        alpha = np.where(searching, alpha - (phi + radius) * ratio / radius, alpha)
+
+        searching &= np.abs(phi) >= rtol * radius
+
+    step = -np.matmul(vt.transpose(0, 2, 1), (suf / (s ** 2 + alpha[:, None]))[:, :, None])[:, :, 0]
+    step *= (radius / np.linalg.norm(step, axis=1))[:, None]
+
+    return np.where(done[:, None], gauss_newton, step), np.where(done, 0., alpha)
+
+
+def _initial_params(x, ys, yls, rows, mask, weight_method):
+    """
+    OLS intercept, slope and y lag parameters of each window for the initial weights
+    """
+    theta = weight_method.init_params()
+
+    xw = np.where(mask, x.dot(weight_method.weights(x.shape[1], theta))[rows], 0.)
+    z = np.concatenate([mask[:, :, None].astype(float), xw[:, :, None], yls], axis=2)
+
+    c = np.matmul(np.linalg.pinv(z), ys[:, :, None])[:, :, 0]
+
+    return np.concatenate([c[:, :2], np.tile(theta, (len(c), 1)), c[:, 2:]], axis=1)
+
+
+def _residuals(params, x, ys, yls, rows, mask, weight_method):
+    """
+    Residuals and Jacobian of each window, zero on the padding rows
+
+    Returns:
+        (array, array): windows x rows residuals and windows x rows x parameters Jacobian
+    """
+    a, b, theta, lags = unpack_params(params.T, weight_method)
+    nlags = x.shape[1]
+    cols = np.arange(len(params))[:, None]
+
+    xw = x.dot(weight_method.weights_grid(nlags, theta.T))[rows, cols]
+    jwx = x.dot(weight_method.weights_jacobian_grid(nlags, theta.T).reshape((nlags, -1)))
+    jwx = jwx.reshape((-1, len(params), weight_method.num_params))[rows, cols]
+
+    fitted = a[:, None] + b[0][:, None] * xw + np.matmul(yls, lags.T[:, :, None])[:, :, 0]
+    resid = np.where(mask, ys - fitted, 0.)
+
+    jac = np.concatenate([np.ones(xw.shape + (1,)), xw[:, :, None], b[0][:, None, None] * jwx, yls], axis=2)
+    jac = -np.where(mask[:, :, None], jac, 0.)
+
+    return resid, jac
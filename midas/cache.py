@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from .mix import LagOperator
+
+
+class FitCache(object):
+    """
+    On-disk memo of estimation results, keyed by the aligned data and the model
+
+    Pass one as the cache argument of estimate (or through midas_adl, rolling and
+    recursive, which pass it on) and a fit whose y, yl, x, weight method and solver
+    settings have been seen before is read back instead of re-estimated.  Repeated
+    backtests then only pay for windows whose data changed.
+
+    Entries are pickled OptimizeResults, one file per key.  Reading an entry marks it as
+    recently used, and once the entries take more than max_bytes the least recently
+    used are deleted.  Files are written atomically, so processes can share a cache.
+
+    Args:
+        path (str): Directory of the cache; created if needed
+        max_bytes (int): Size bound of the cache
+    """
+    def __init__(self, path, max_bytes=2 ** 28):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        os.makedirs(path, exist_ok=True)
+        self._size = None
+
+    def __getstate__(self):
+        # Worker processes measure the cache themselves
+        return dict(self.__dict__, _size=None)
+
+    @staticmethod
+    def key(y, yl, x, weight_method, **settings):
+        """
+        Digest of the data arrays, the weight method and the estimation settings
+
+        Returns:
+            str
+        """
+        h = hashlib.sha1()
+        for a in (y, yl, x):
+            if a is None:
+                h.update(b'none')
+            elif isinstance(a, LagOperator):
+                values, ends = a.span()
+                h.update(repr(a.shape).encode())
+                h.update(np.ascontiguousarray(values).tobytes())
+                h.update(ends.tobytes())
+            else:
+                a = np.ascontiguousarray(a, dtype=float)
+                h.update(repr(a.shape).encode())
+                h.update(a.tobytes())
+
+        h.update(_describe(weight_method).encode())
+        for name, value in sorted(settings.items()):
+            if isinstance(value, np.ndarray):
+                value = value.tolist()
+            h.update(repr((name, value)).encode())
+
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Cached result for key, or None
+        """
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                res = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        return res
+
+    def put(self, key, res):
+        """
+        Store res for key, evicting the least recently used entries if the cache is full
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(res, f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, self._filename(key))
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += size
+
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def size(self):
+        """
+        Total size of the entries, in bytes
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self, target=None):
+        """
+        Delete least recently used entries until the cache holds at most target bytes,
+        by default 90% of max_bytes
+        """
+        if target is None:
+            target = 0.9 * self.max_bytes
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+
+        for filename, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            total -= size
+
+        self._size = total
+
+    def clear(self):
+        self.evict(0)
+
+    def _filename(self, key):
+        return os.path.join(self.path, key + '.pkl')
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_mtime_ns, stat.st_size))
+
+        return entries
+
+
+def _describe(weight_method):
+    """
+    Text identifying a weight method's type and configuration
+    """
+    if hasattr(weight_method, 'weight_methods'):
+        return 'StackedWeights({}, {})'.format([_describe(wm) for wm in weight_method.weight_methods],
+                                               weight_method.nlags)
+
+    return '{}({})'.format(type(weight_method).__name__, sorted(vars(weight_method).items()))
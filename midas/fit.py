@@ -1,13 +1,19 @@
 import numpy as np
 
+from scipy.linalg import solve_triangular
+
+# Convergence settings of the optimizers; part of the key of cached fits
+SOLVER_OPTIONS = dict(xtol=1e-9, ftol=1e-9, max_nfev=5000)
+
 
 def ssr(a, x, y, yl, weight_method):
     """
-    Calculate the sum of the squared residuals of the MiDAS equations.  Parameters are arranged
+    Calculate the sum of the squared residuals of the MiDAS equations.  With k high-frequency
+    regressors and p weight parameters in total, parameters are arranged
     a_h = a[0]
-    b_h = a[1]
-    theta is a[2:n]
-    y lag params are a[n:]
+    b_h = a[1:1 + k]
+    theta is a[1 + k:1 + k + p]
+    y lag params are a[1 + k + p:]
 
     Args:
         a:
@@ -18,38 +24,278 @@ def ssr(a, x, y, yl, weight_method):
     Returns:
 
     """
-    xw, _ = weight_method.x_weighted(x, a[2:4])
+    a_h, b_h, theta, lags = unpack_params(a, weight_method)
 
-    error = y - a[0] - a[1] * xw
+    xw = weight_method.x_weighted(x, theta)
+
+    error = y - a_h - np.dot(xw.reshape((len(xw), -1)), b_h)
     if yl is not None:
-        error -= np.dot(yl, a[4:])
+        error -= np.dot(yl, lags)
 
     return error
 
 
 def jacobian(a, x, y, yl, weight_method):
 
-    jwx = jacobian_wx(x, a[2:4], weight_method)
+    a_h, b_h, theta, lags = unpack_params(a, weight_method)
+
+    jwx = jacobian_wx(x, theta, weight_method)
+
+    xw = weight_method.x_weighted(x, theta)
+
+    columns = [np.ones((len(xw), 1)), xw.reshape((len(xw), -1)), b_h[weight_method.param_regressor] * jwx]
+    if yl is not None:
+        columns.append(yl)
+
+    return -1.0 * np.concatenate(columns, axis=1)
+
+
+def unpack_params(a, weight_method):
+    """
+    Split a MIDAS parameter vector into intercept, slopes, weight parameters and y lag parameters
+
+    Returns:
+        (float, array, array, array)
+    """
+    k = weight_method.num_regressors
+    p = weight_method.num_params
+
+    return a[0], a[1:1 + k], a[1 + k:1 + k + p], a[1 + k + p:]
 
-    xw, _ = weight_method.x_weighted(x, a[2:4])
 
-    if yl is None:
-        jac_e = np.concatenate([np.ones((len(xw), 1)), xw.reshape((len(xw), 1)), (a[1] * jwx)], axis=1)
-    else:
-        jac_e = np.concatenate([np.ones((len(xw), 1)), xw.reshape((len(xw), 1)), (a[1] * jwx), yl], axis=1)
+def pack_params(c, theta, weight_method):
+    """
+    Combine the linear parameters (intercept, slopes, y lag parameters, as ordered by
+    regressors()) with the weight parameters into a MIDAS parameter vector
+    """
+    k = weight_method.num_regressors
 
-    return -1.0 * jac_e
+    return np.concatenate([c[0:1 + k], theta, c[1 + k:]])
 
 
 def jacobian_wx(x, params, weight_method):
+    """
+    Derivatives of the weighted regressor with respect to the weight parameters
+
+    Uses the weight method's own x_weighted_jacobian or closed-form weights_jacobian
+    when it has one, and central finite differences otherwise.
+
+    Returns:
+        array: len(x) x len(params) array
+    """
+    if hasattr(weight_method, 'x_weighted_jacobian'):
+        return weight_method.x_weighted_jacobian(x, params)
+
+    if hasattr(weight_method, 'weights_jacobian'):
+        return x.dot(weight_method.weights_jacobian(x.shape[1], params))
+
     eps = 1e-6
 
     jt = []
     for i, p in enumerate(params):
         dp = np.concatenate([params[0:i], [p + eps / 2], params[i + 1:]])
         dm = np.concatenate([params[0:i], [p - eps / 2], params[i + 1:]])
-        jtp, _ = weight_method.x_weighted(x, dp)
-        jtm, _ = weight_method.x_weighted(x, dm)
+        jtp = weight_method.x_weighted(x, dp)
+        jtm = weight_method.x_weighted(x, dm)
         jt.append((jtp - jtm) / eps)
 
     return np.column_stack(jt)
+
+
+def regressors(xw, yl):
+    """
+    Matrix of the terms that enter the MIDAS equation linearly: a constant, the weighted
+    high-frequency regressors and the low-frequency lags
+
+    Args:
+        xw: Weighted high-frequency regressor(s)
+        yl: Lags of low-frequency data, or None
+
+    Returns:
+        array: len(xw) x (1 + number of regressors + number of y lags) array
+    """
+    columns = [np.ones((len(xw), 1)), xw.reshape((len(xw), -1))]
+    if yl is not None:
+        columns.append(yl)
+
+    return np.concatenate(columns, axis=1)
+
+
+def linear_params(theta, x, y, yl, weight_method, factors=None):
+    """
+    OLS estimates of the intercept, slope and y lag parameters for fixed weight parameters
+
+    Args:
+        factors (tuple): profile_factors at theta, if already computed
+
+    Returns:
+        array: a_h, b_h (one per regressor) followed by the y lag parameters
+    """
+    if factors is not None:
+        q, r = factors
+        return solve_triangular(r, np.dot(q.T, y))
+
+    z = regressors(weight_method.x_weighted(x, theta), yl)
+
+    return np.linalg.lstsq(z, y, rcond=None)[0]
+
+
+def grid_ssr(grid, x, y, yl, weight_method):
+    """
+    Sum of squared OLS residuals for each candidate of weight parameters
+
+    All the candidates' weighted regressors come from one product of x with the matrix
+    of their weights.  The constant and y lags are projected out of y and of those
+    regressors once, and the remaining least-squares fits are solved as a stack.
+
+    Args:
+        grid (array): ncandidates x num_params array of weight parameters
+
+    Returns:
+        array: ncandidates sums of squared residuals, inf where the weights are not finite
+    """
+    k = weight_method.num_regressors
+
+    xw = x.dot(weight_method.weights_grid(x.shape[1], grid))
+
+    q, _ = np.linalg.qr(regressors(np.empty((len(y), 0)), yl))
+    ry = y - np.dot(q, np.dot(q.T, y))
+    rx = xw - np.dot(q, np.dot(q.T, np.nan_to_num(xw)))
+
+    # Candidates x nobs x regressors
+    rx = rx.reshape((len(y), len(grid), k)).transpose(1, 0, 2)
+    finite = np.isfinite(rx).all(axis=(1, 2))
+    rx[~finite] = 0.
+
+    coef = np.matmul(np.linalg.pinv(rx), ry)
+    resid = ry - np.matmul(rx, coef[:, :, None])[:, :, 0]
+
+    return np.where(finite, (resid ** 2).sum(axis=1), np.inf)
+
+
+def linear_weights_params(x, y, yl, weight_method, ridge=None):
+    """
+    Least-squares MIDAS parameters for weights that are linear in their parameters
+
+    The weighted regressors are then linear in the weight parameters, so all parameters
+    come from one least-squares solve on the constant, the lags projected on the
+    weights' basis and the y lags.  The slopes are fixed at 1.
+
+    Args:
+        x:
+        y:
+        yl:
+        weight_method (LinearWeights): Weight method with an x_basis
+        ridge (float): Penalty on the squared weight parameters
+
+    Returns:
+        array: Parameter vector, as for ssr
+    """
+    p = weight_method.num_params
+
+    z = regressors(weight_method.x_basis(x), yl)
+
+    if ridge:
+        penalty = np.zeros((p, z.shape[1]))
+        penalty[:, 1:1 + p] = np.sqrt(ridge) * np.eye(p)
+
+        z = np.concatenate([z, penalty])
+        y = np.concatenate([y, np.zeros(p)])
+
+    return pack_linear_weights(np.linalg.lstsq(z, y, rcond=None)[0], weight_method)
+
+
+def pack_linear_weights(c, weight_method):
+    """
+    MIDAS parameter vector from the coefficients of the regression on regressors(x_basis(x), yl),
+    with the slopes fixed at 1
+    """
+    k = weight_method.num_regressors
+    p = weight_method.num_params
+
+    return pack_params(np.concatenate([c[:1], np.ones(k), c[1 + p:]]), c[1:1 + p], weight_method)
+
+
+def qr_append(r, rows):
+    """
+    Update the triangular factor of a QR decomposition for rows appended to the matrix
+
+    If r is the R of A, the R of A with rows stacked below it is the R of r with the rows
+    stacked below it, so the update costs O((m + len(rows)) * m^2) whatever the number of
+    rows of A.  Start from a matrix of zeros to decompose rows from scratch.
+
+    Args:
+        r (array): m x m upper triangular factor
+        rows (array): k x m rows to append
+
+    Returns:
+        array: m x m upper triangular factor of the extended matrix
+    """
+    if len(rows) == 0:
+        return r
+
+    return np.linalg.qr(np.concatenate([r, rows]), mode='r')
+
+
+def profile_factors(theta, x, yl, weight_method):
+    """
+    QR factors of regressors() for the weight parameters theta, which profile_ssr,
+    profile_jacobian and linear_params can share at the same theta
+
+    Returns:
+        (array, array): q, r
+    """
+    return np.linalg.qr(regressors(weight_method.x_weighted(x, theta), yl))
+
+
+def profile_ssr(theta, x, y, yl, weight_method, factors=None):
+    """
+    Residuals of the MIDAS equation with the linear parameters concentrated out, i.e. the
+    OLS residuals of y on regressors() for the weight parameters theta
+
+    Args:
+        theta: Weight parameters
+        x:
+        y:
+        yl:
+        factors (tuple): profile_factors at theta, if already computed
+
+    Returns:
+        array: Residuals
+    """
+    q, _ = factors if factors is not None else profile_factors(theta, x, yl, weight_method)
+
+    return y - np.dot(q, np.dot(q.T, y))
+
+
+def profile_jacobian(theta, x, y, yl, weight_method, factors=None):
+    """
+    Jacobian of profile_ssr with respect to theta (Golub-Pereyra variable projection)
+
+    Only the weighted regressor columns of the linear design depend on theta, so the
+    derivative of the projected residual r = P y is
+
+        dr/dtheta_j = -(P dZ_j b + pinv(Z).T dZ_j.T r)
+
+    where dZ_j is jacobian_wx[:, j] placed in the column of the regressor that theta_j
+    weights, P projects off the columns of Z and b are the OLS parameters.  factors are
+    profile_factors at theta, if already computed.
+    """
+    q, r = factors if factors is not None else profile_factors(theta, x, yl, weight_method)
+
+    # r is only as wide as the linear parameters, so one inverse serves both solves below
+    r_inv = solve_triangular(r, np.eye(len(r)), check_finite=False)
+    slope_column = 1 + weight_method.param_regressor
+
+    qty = np.dot(q.T, y)
+    b = np.dot(r_inv, qty)
+    resid = y - np.dot(q, qty)
+
+    jwx = jacobian_wx(x, theta, weight_method)
+
+    dzb = b[slope_column] * jwx
+    projected = dzb - np.dot(q, np.dot(q.T, dzb))
+
+    pinv_slope = np.dot(q, r_inv[slope_column].T)
+
+    return -(projected + pinv_slope * np.dot(jwx.T, resid))
@@ -0,0 +1,97 @@
+import contextlib
+import time
+
+import pandas as pd
+
+
+class Instrument(object):
+    """
+    Records the wall time of each stage of a fit and the optimizer's statistics
+
+    Pass one as the instrument argument of mix_freq, estimate, forecast or midas_adl.  Each
+    stage adds a record: a dict with the stage name, its wall time in seconds and any
+    details, e.g. nfev, njev and status for 'optimize'.  The stages are
+
+        align     building the lag matrices (mix_freq, and the drivers' designs)
+        init      the OLS fit that gives the optimizer's starting point
+        search    evaluating the multi-start grid, with the number of candidates
+        optimize  a least_squares run, with nfev, njev, status, success and warm (started from x0),
+                  or an estimate_batch run, with batch, windows, iterations and the totals of nfev and njev
+        solve     the least-squares fit of a model with linear weights
+        cache     looking up a fit in a FitCache, with hit
+        forecast  forecasting from fitted parameters
+        window    fitting and forecasting one rolling/recursive window, with its start and stop rows
+        backtest  a whole midas_adl run, with the method and number of windows
+
+    Records made in worker processes are passed back and added, in window order, when
+    the workers finish.  Without an instrument the functions only do a None check per
+    stage.
+
+    Args:
+        callback (callable): Called with each record as it is added
+    """
+    def __init__(self, callback=None):
+        self.records = []
+        self.callback = callback
+
+    @contextlib.contextmanager
+    def stage(self, name, **info):
+        """
+        Time the body of a with block as stage name; details can be added to the yielded dict
+        """
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.add(dict(stage=name, seconds=time.perf_counter() - start, **info))
+
+    def add(self, record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def extend(self, records):
+        for record in records:
+            self.add(record)
+
+    def to_frame(self):
+        """
+        Returns:
+            DataFrame: One row per record
+        """
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        """
+        Returns:
+            DataFrame: Count, total and mean wall time of each stage, with the total
+            function and Jacobian evaluations of the optimizer
+        """
+        records = self.to_frame()
+        if records.empty:
+            return pd.DataFrame(columns=['count', 'seconds', 'mean', 'nfev', 'njev'])
+
+        for column in ('nfev', 'njev'):
+            if column not in records:
+                records[column] = 0
+
+        summary = records.groupby('stage', sort=False).agg(count=('seconds', 'size'),
+                                                            seconds=('seconds', 'sum'),
+                                                            mean=('seconds', 'mean'),
+                                                            nfev=('nfev', 'sum'),
+                                                            njev=('njev', 'sum'))
+
+        return summary.astype({'nfev': int, 'njev': int})
+
+
+_UNTIMED = contextlib.nullcontext({})
+
+
+def stage(instrument, name, **info):
+    """
+    instrument.stage(name, **info), or a shared no-op context when instrument is None
+    """
+    if instrument is None:
+        return _UNTIMED
+
+    return instrument.stage(name, **info)
@@ -1,67 +1,498 @@
+import copy
 import datetime
 import re
 import pandas as pd
 import numpy as np
 
+from scipy.signal import convolve
 
-def mix_freq(lf_data, hf_data, xlag, ylag, horizon, start_date=None, end_date=None):
+from .instrument import stage
+
+
+def mix_freq(lf_data, hf_data, xlag, ylag, horizon, start_date=None, end_date=None, instrument=None):
     """
     Set up data for mixed-frequency regression
 
     Args:
         lf_data (Series): Low-frequency time series
-        hf_data (Series): High-frequency time series
-        xlag (int or str): Number of high frequency lags
+        hf_data (Series, DataFrame or list of Series): High-frequency time series.  With
+            several series the lag matrices are stacked side by side and x has
+            (regressor, lag) MultiIndex columns.
+        xlag (int or str, or list of them): Number of high frequency lags, for each regressor
         ylag (int or str): Number of low-frequency lags
         horizon (int):
         start_date (date): Date on which to start estimation
         end_date (date); Date on which to end estimation
+        instrument (Instrument): Record the time taken as the 'align' stage
 
     Returns:
 
     """
-    ylag = calculate_lags(ylag, lf_data)
-    xlag = calculate_lags(xlag, hf_data)
+    with stage(instrument, 'align'):
+        return MixDesign(lf_data, hf_data, xlag, ylag, horizon).window(start_date, end_date)
+
+
+class MixDesign(object):
+    """
+    Mixed-frequency regression design, aligned once and sliced into estimation windows
+
+    The low-frequency target, its lags and the high-frequency lag matrix are built for
+    every usable low-frequency date when the design is created.  Estimation windows
+    are then just row slices, so rolling and recursive evaluations do a single
+    alignment no matter how many windows they fit.
+
+    A lazy design keeps the high-frequency series and its alignment positions instead
+    of the lag matrix: arrays() gives a LagOperator, which the fitting functions weight
+    by convolution, and the x DataFrame is only built if it is asked for.
+
+    Args:
+        lf_data (Series): Low-frequency time series
+        hf_data (Series, DataFrame or list of Series): High-frequency time series
+        xlag (int or str, or list of them): Number of high frequency lags, for each regressor
+        ylag (int or str): Number of low-frequency lags
+        horizon (int):
+        lazy (bool): Don't materialize the lag matrix; hf_data must be a single Series
+    """
+    def __init__(self, lf_data, hf_data, xlag, ylag, horizon, lazy=False):
+        hf_list = hf_series(hf_data)
+        xlags = xlag if isinstance(xlag, (list, tuple)) else [xlag] * len(hf_list)
+
+        self.ylag = calculate_lags(ylag, lf_data)
+        xlags = [calculate_lags(lag, hf) for lag, hf in zip(xlags, hf_list)]
+        self.horizon = horizon
+
+        lf_index = lf_data.index
+
+        # First date with enough low- and high-frequency history for all the lags
+        min_loc = self.ylag
+        min_date_x = max(hf.index[lag + horizon] for hf, lag in zip(hf_list, xlags))
+        if lf_index[min_loc] < min_date_x:
+            min_loc = lf_index.searchsorted(min_date_x, side='right')
+
+        # Last date that is covered by the high-frequency data
+        max_loc = len(lf_index) - 1
+        max_date_x = min(hf.index[-1] for hf in hf_list)
+        if lf_index[max_loc] > max_date_x:
+            max_loc = lf_index.searchsorted(max_date_x, side='left') - 1
+
+        self.index = lf_index[min_loc:max_loc + 1]
+        self.default_end_date = lf_index[-2]
+
+        self._x = None
+        self._lags = None
+        if lazy:
+            if not isinstance(hf_data, pd.Series):
+                raise ValueError('A lazy design takes a single high-frequency series')
+
+            self.names = None
+            self.xlag = xlags[0]
+            self._lags = LagOperator(hf_data.values, hf_data.index.searchsorted(self.index, side='left') - horizon,
+                                     self.xlag)
+        elif isinstance(hf_data, pd.Series):
+            self.names = None
+            self.xlag = xlags[0]
+            self.x = pd.DataFrame(data=lag_matrix(hf_data, self.index, self.xlag, horizon), index=self.index)
+        else:
+            self.names = [hf.name if hf.name is not None else 'x{}'.format(i) for i, hf in enumerate(hf_list)]
+            self.xlag = xlags
+            self.x = pd.DataFrame(data=np.hstack([lag_matrix(hf, self.index, lag, horizon)
+                                                  for hf, lag in zip(hf_list, xlags)]),
+                                  index=self.index,
+                                  columns=pd.MultiIndex.from_tuples([(name, i)
+                                                                     for name, lag in zip(self.names, xlags)
+                                                                     for i in range(lag)]))
+
+        self._set_target(lf_data)
+
+    @property
+    def x(self):
+        """
+        High-frequency lag matrix (DataFrame), built on first use for lazy designs
+        """
+        if self._x is None and self._lags is not None:
+            self._x = pd.DataFrame(data=np.asarray(self._lags), index=self.index)
+
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+
+    def _set_target(self, lf_data):
+        self._arrays = None
+
+        positions = lf_data.index.get_indexer(self.index)
+        if (positions < 0).any():
+            raise ValueError('Low-frequency data does not cover the dates of the design')
+
+        self.y = lf_data.iloc[positions]
+
+        self.yl = None
+        if self.ylag > 0:
+            # N.B. ylags will be a dataframe because there can be more than 1 lag
+            self.yl = pd.DataFrame(data=lag_rows(lf_data.values, positions - 1, self.ylag),
+                                   index=self.index,
+                                   columns=[lf_data.name] * self.ylag)
+
+    def retarget(self, lf_data):
+        """
+        Design for another low-frequency series on the same dates, sharing the high-frequency lags
+
+        Args:
+            lf_data (Series): Low-frequency time series with the same index as the original
+
+        Returns:
+            MixDesign
+        """
+        design = copy.copy(self)
+        design._set_target(lf_data)
+
+        return design
+
+    def subset(self, xlag, ylag):
+        """
+        Design with fewer lags on the same dates, by slicing the lag columns
+
+        Args:
+            xlag (int, or list of int): Number of high frequency lags, at most self.xlag
+            ylag (int): Number of low-frequency lags, at most self.ylag
+
+        Returns:
+            MixDesign
+        """
+        xlags = xlag if self.names is not None else [xlag]
+        full_xlags = self.xlag if self.names is not None else [self.xlag]
+
+        if any(lag > full for lag, full in zip(xlags, full_xlags)) or ylag > self.ylag:
+            raise ValueError('Subset lags must not exceed the lags of the design')
+
+        offsets = np.cumsum([0] + full_xlags)
+        columns = np.concatenate([np.arange(offset, offset + lag) for offset, lag in zip(offsets, xlags)])
+
+        design = copy.copy(self)
+        design.xlag = xlag
+        design.ylag = ylag
+        if self._lags is not None:
+            design._lags = self._lags.with_lags(xlag)
+            design.x = None
+        else:
+            design.x = self.x.iloc[:, columns]
+        design.yl = self.yl.iloc[:, :ylag] if ylag > 0 else None
+        design._arrays = None
+
+        return design
+
+    def __len__(self):
+        return len(self.index)
+
+    def locate(self, start_date=None, end_date=None):
+        """
+        Convert window dates to row positions, clipped to the usable sample
+
+        Args:
+            start_date (date): Date on which to start estimation
+            end_date (date): Date on which to end estimation
+
+        Returns:
+            (int, int): Positions of the first estimation row and first forecast row
+        """
+        start = 0
+        if start_date is not None:
+            start = self.index.searchsorted(start_date, side='left')
+
+        if end_date is None:
+            end_date = self.default_end_date
+        stop = min(self.index.searchsorted(end_date, side='right'), len(self.index))
+
+        return start, stop
+
+    def window(self, start_date=None, end_date=None):
+        """
+        Slice the design into an estimation window and the forecast period after it
+
+        Args:
+            start_date (date): Date on which to start estimation
+            end_date (date): Date on which to end estimation
+
+        Returns:
+            (y, yl, x, yf, ylf, xf), as returned by mix_freq
+        """
+        return self.iwindow(*self.locate(start_date, end_date))
+
+    def iwindow(self, start, stop):
+        """
+        Slice the design by row position
+
+        Args:
+            start (int): First estimation row
+            stop (int): First forecast row; estimation uses rows start to stop - 1
+
+        Returns:
+            (y, yl, x, yf, ylf, xf), as returned by mix_freq
+        """
+        return (self.y.iloc[start:stop],
+                self.yl.iloc[start:stop] if self.yl is not None else None,
+                self.x.iloc[start:stop],
+                self.y.iloc[stop:],
+                self.yl.iloc[stop:] if self.yl is not None else None,
+                self.x.iloc[stop:])
+
+    def arrays(self):
+        """
+        The design as plain arrays, for the array-level functions in midas.adl
+
+        Returns:
+            (y, yl, x): ndarrays for every row of the design, with x in row-major order (a
+            LagOperator for lazy designs); yl is None without y lags
+        """
+        if self._arrays is None:
+            self._arrays = (self.y.values,
+                            self.yl.values if self.yl is not None else None,
+                            self._lags if self._lags is not None else np.ascontiguousarray(self.x.values))
+
+        return self._arrays
+
+    def iarrays(self, start, stop):
+        """
+        Slice the design arrays by row position, like iwindow
+
+        Returns:
+            (y, yl, x, yf, ylf, xf) ndarrays
+        """
+        y, yl, x = self.arrays()
+
+        return (y[start:stop],
+                yl[start:stop] if yl is not None else None,
+                x[start:stop],
+                y[stop:],
+                yl[stop:] if yl is not None else None,
+                x[stop:])
+
+
+def hf_series(hf_data):
+    """
+    High-frequency regressors as a list of Series
+
+    Args:
+        hf_data (Series, DataFrame or list of Series): High-frequency time series
+
+    Returns:
+        list
+    """
+    if isinstance(hf_data, pd.Series):
+        return [hf_data]
+    if isinstance(hf_data, pd.DataFrame):
+        return [hf_data[column] for column in hf_data.columns]
 
-    min_date_y = lf_data.index[ylag]
-    min_date_x = hf_data.index[xlag + horizon]
+    return list(hf_data)
 
-    if min_date_y < min_date_x:
-        min_date_y = next(d for d in list(lf_data.index) if d > min_date_x)
 
-    if (start_date is None) or (start_date < min_date_y):
-        start_date = min_date_y
-    if end_date is None:
-        end_date = lf_data.index[-2]
+def lag_matrix(hf_data, lf_index, xlag, horizon):
+    """
+    Build the matrix of high-frequency lags aligned to low-frequency dates
+
+    Row i holds the xlag high-frequency observations ending horizon periods before
+    the first high-frequency date on or after lf_index[i], most recent first.  All
+    alignment positions are found with a single searchsorted and the rows are
+    gathered from a strided view of the high-frequency values.  Lags that fall
+    outside the high-frequency sample are NaN.
+
+    Args:
+        hf_data (Series): High-frequency time series
+        lf_index (DatetimeIndex): Low-frequency dates to align to
+        xlag (int): Number of high frequency lags
+        horizon (int): Number of high-frequency periods between low-frequency date and most recent lag
+
+    Returns:
+        ndarray: len(lf_index) x xlag array of lags
+    """
+    positions = hf_data.index.searchsorted(lf_index, side='left') - horizon
+
+    return lag_rows(hf_data.values, positions, xlag)
+
+
+def lag_rows(values, positions, xlag):
+    """
+    Gather runs of xlag consecutive values ending at the given positions
+
+    Row i of the result is values[p], values[p - 1], ..., values[p - xlag + 1] for
+    p = positions[i].  The runs are taken from a sliding-window view of the span of
+    values the positions touch, so the only copy made is the gather itself, even when
+    values is memory-mapped; if some positions need NaN padding only that span is
+    copied.
+
+    Args:
+        values (ndarray): 1-d array of high-frequency values
+        positions (ndarray): Integer positions of the most recent lag in each row
+        xlag (int): Number of lags
+
+    Returns:
+        ndarray: len(positions) x xlag array
+    """
+    positions = np.asarray(positions)
+    if len(positions) == 0:
+        return np.empty((0, xlag), dtype=np.result_type(values, float))
+
+    span, ends = _lag_span(values, positions, xlag)
 
-    max_date = lf_data.index[-1]
-    if max_date > hf_data.index[-1]:
-        max_date = next(d for d in reversed(list(lf_data.index)) if d < hf_data.index[-1])
+    windows = np.lib.stride_tricks.sliding_window_view(span, xlag)[:, ::-1]
 
-    if end_date > max_date:
-        end_date = max_date
+    return windows[ends - xlag + 1]
+
+
+def _lag_span(values, positions, xlag):
+    """
+    The values that lags xlag ending at positions touch, NaN-padded past either end of
+    values, and the positions in that span
+    """
+    first = positions.min() - xlag + 1
+    last = positions.max() + 1
+
+    span = values[max(first, 0):max(min(last, len(values)), 0)]
+    lo = max(0, -first)
+    hi = max(0, last - first - lo - len(span))
+    if lo or hi:
+        span = np.concatenate([np.full(lo, np.nan), span, np.full(hi, np.nan)])
+
+    return span, positions - first
+
+
+class LagOperator(object):
+    """
+    Lag matrix of a high-frequency series that is never materialized
+
+    Stands in for the len(positions) x xlag array returned by lag_rows in the fitting
+    functions: weighting the lags, x.dot(w), convolves the series with the weight
+    vector and samples the result at the alignment positions, so memory scales with
+    the length of the series rather than with the number of rows times xlag.  Long
+    lag polynomials are convolved by FFT (unless the series has missing values, whose
+    NaN would spread through the transform), short ones directly.  The convolution is
+    evaluated at every high-frequency position the rows span, not only the aligned ones,
+    so this trades time for memory.
+
+    Row slices and index arrays give the operator of those rows, sharing the series;
+    np.asarray materializes the matrix.  An operator on a memory-mapped series, e.g. one
+    read by store.load, pickles a reference to the file rather than the values, so worker
+    processes map the same pages instead of receiving copies.
+
+    Args:
+        values (ndarray): 1-d array of high-frequency values
+        positions (ndarray): Integer positions of the most recent lag in each row
+        xlag (int): Number of lags
+    """
+    ndim = 2
+
+    def __init__(self, values, positions, xlag):
+        positions = np.asarray(positions, dtype=int)
+        if len(positions):
+            values, positions = _lag_span(np.asarray(values, dtype=float), positions, xlag)
+
+        self.values = values
+        self.ends = positions
+        self.xlag = xlag
+        self._finite = not np.isnan(values).any()
+
+    @classmethod
+    def _from_span(cls, values, ends, xlag, finite):
+        op = cls.__new__(cls)
+        op.values = values
+        op.ends = ends
+        op.xlag = xlag
+        op._finite = finite
+
+        return op
+
+    def __reduce__(self):
+        source = _mapped_source(self.values)
+        if source is None:
+            return LagOperator._from_span, (self.values, self.ends, self.xlag, self._finite)
+
+        return _mapped_operator, source + (len(self.values), self.ends, self.xlag, self._finite)
+
+    @property
+    def shape(self):
+        return len(self.ends), self.xlag
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, rows):
+        return LagOperator._from_span(self.values, self.ends[rows], self.xlag, self._finite)
+
+    def with_lags(self, xlag):
+        """
+        Operator of the first xlag lags of each row
+        """
+        return LagOperator._from_span(self.values, self.ends, xlag, self._finite)
+
+    def span(self):
+        """
+        The values the rows use and the position of each row's most recent lag in them
+
+        Returns:
+            (ndarray, ndarray)
+        """
+        if len(self.ends) == 0:
+            return self.values[:0], self.ends
+
+        first = self.ends.min()
+
+        return self.values[first - self.xlag + 1:self.ends.max() + 1], self.ends - first
+
+    def dot(self, w):
+        """
+        Product of the lag matrix with a weight vector, or with each column of a weight matrix
+
+        Returns:
+            ndarray: len(self) array, or len(self) x w.shape[1]
+        """
+        w = np.asarray(w, dtype=float)
+        if w.ndim == 2:
+            return np.column_stack([self.dot(column) for column in w.T]).reshape((len(self), w.shape[1]))
+
+        values, ends = self.span()
+        if len(ends) == 0:
+            return np.empty(0)
+
+        method = 'auto' if self._finite else 'direct'
+
+        return convolve(values, w, mode='valid', method=method)[ends]
+
+    def __array__(self, dtype=None, copy=None):
+        values, ends = self.span()
+        if len(ends) == 0:
+            return np.empty((0, self.xlag), dtype=dtype)
+
+        windows = np.lib.stride_tricks.sliding_window_view(values, self.xlag)[:, ::-1]
+
+        return np.asarray(windows[ends], dtype=dtype)
+
+
+def _mapped_source(values):
+    """
+    File name and byte offset of a contiguous float array that is a view of a memmap, or None
+    """
+    if values.dtype != float or not values.flags.c_contiguous:
+        return None
 
-    forecast_start_date = lf_data.index[lf_data.index.get_loc(end_date) + 1]
+    # Slices of a memmap are memmaps too; the innermost one is the file's mapping
+    mapped = None
+    base = values
+    while base is not None:
+        if isinstance(base, np.memmap):
+            mapped = base
+        base = getattr(base, 'base', None)
 
-    ylags = None
-    if ylag > 0:
-        # N.B. ylags will be a dataframe because there can be more than 1 lag
-        ylags = pd.concat([lf_data.shift(lag) for lag in range(1, ylag + 1)], axis=1)
+    if mapped is None or mapped.filename is None:
+        return None
 
-    x_rows = []
+    return mapped.filename, mapped.offset + values.ctypes.data - mapped.ctypes.data
 
-    for lfdate in lf_data.loc[start_date:max_date].index:
-        start_hf = hf_data.index.get_indexer([lfdate], method='bfill')[0]  # @todo Find a more efficient way
-        x_rows.append(hf_data.iloc[start_hf - horizon: start_hf - xlag - horizon: -1].values)
 
-    x = pd.DataFrame(data=x_rows, index=lf_data.loc[start_date:max_date].index)
+def _mapped_operator(filename, offset, size, ends, xlag, finite):
+    values = np.memmap(filename, dtype=float, mode='r', offset=offset, shape=(size,))
 
-    return (lf_data.loc[start_date:end_date],
-            ylags.loc[start_date:end_date] if ylag > 0 else None,
-            x.loc[start_date:end_date],
-            lf_data[forecast_start_date:max_date],
-            ylags[forecast_start_date:max_date] if ylag > 0 else None,
-            x.loc[forecast_start_date:])
+    return LagOperator._from_span(values, ends, xlag, finite)
 
 
 def calculate_lags(lag, time_series):
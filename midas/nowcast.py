@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from pandas.tseries.frequencies import to_offset
+
+from .adl import estimate
+from .fit import unpack_params
+from .mix import MixDesign, calculate_lags, data_freq, hf_series
+from .weights import polynomial_weights
+
+
+class Nowcast(object):
+    """
+    Forecast of the current low-frequency period that is updated as high-frequency data arrive
+
+    The fitted parameters and weights are fixed; each regressor only keeps the most recent
+    xlag observations that are relevant to the target period.  Appending observations
+    shifts that window and recomputes the forecast in O(xlag), without re-estimating.
+
+    When the target period's high-frequency data are incomplete (the ragged edge), the
+    lags are realigned so that the most recent observation takes the place of the first
+    lag; missing counts how many high-frequency periods are still outstanding.
+
+    Args:
+        res (OptimizeResult): Fitted MIDAS model, as returned by estimate
+        y_in (Series): Low-frequency data used to fit the model
+        x_in (Series, DataFrame or list of Series): High-frequency data observed so far
+        xlag (int or str, or list of them): Number of high frequency lags, for each regressor
+        ylag (int or str): Number of low-frequency lags
+        horizon (int):
+        poly (str or list): Weighting polynomial, or one for each regressor
+        target_date (date): Low-frequency period to forecast; defaults to the one after the
+            last observed value of y_in
+    """
+    def __init__(self, res, y_in, x_in, xlag, ylag, horizon, poly='beta', target_date=None):
+        hf_list = hf_series(x_in)
+        xlags = xlag if isinstance(xlag, (list, tuple)) else [xlag] * len(hf_list)
+        xlags = [calculate_lags(lag, hf) for lag, hf in zip(xlags, hf_list)]
+        ylag = calculate_lags(ylag, y_in)
+
+        weight_method = polynomial_weights(poly, xlags[0] if isinstance(x_in, pd.Series) else xlags)
+        a, b, theta, lags = unpack_params(res.x, weight_method)
+
+        if target_date is None:
+            target_date = y_in.dropna().index[-1] + to_offset(data_freq(y_in))
+        self.target_date = pd.Timestamp(target_date)
+
+        # Constant part of the forecast: intercept plus the low-frequency lags
+        self._base = a
+        if ylag > 0:
+            y_lags = y_in[y_in.index < self.target_date].values[::-1][:ylag]
+            self._base += np.dot(y_lags, lags)
+
+        methods = getattr(weight_method, 'weight_methods', [weight_method])
+        self._slopes = b
+        self._weights = [wm.weights(lag, theta[weight_method.param_regressor == i])
+                         for i, (wm, lag) in enumerate(zip(methods, xlags))]
+
+        self._cutoffs = []
+        self._counts = []
+        self._windows = []
+        for hf, lag in zip(hf_list, xlags):
+            calendar = hf.index
+            if calendar[-1] < self.target_date:
+                calendar = calendar.append(pd.date_range(calendar[-1], self.target_date,
+                                                         freq=data_freq(hf))[1:])
+
+            # Position of the most recent lag used for the target period, and the data up to it
+            cutoff = calendar.searchsorted(self.target_date, side='left') - horizon
+            values = hf.values[:cutoff + 1]
+
+            window = np.full(lag, np.nan)
+            recent = values[::-1][:lag]
+            window[:len(recent)] = recent
+
+            self._cutoffs.append(cutoff)
+            self._counts.append(len(values))
+            self._windows.append(window)
+
+        self._contributions = np.array([np.dot(w, window) for w, window in zip(self._weights, self._windows)])
+
+    @classmethod
+    def fit(cls, y_in, x_in, xlag, ylag, horizon, poly='beta', start_date=None, **kwargs):
+        """
+        Estimate the model on all observed low-frequency data and set up the nowcast of the next period
+
+        Args:
+            y_in (Series): Low-frequency dependent variable
+            x_in (Series, DataFrame or list of Series): High-frequency data observed so far
+            xlag (int or str, or list of them): Number of high frequency lags, for each regressor
+            ylag (int or str): Number of low-frequency lags
+            horizon (int):
+            poly (str or list): Weighting polynomial, or one for each regressor
+            start_date (date): Date on which to start estimation
+            **kwargs: Passed to estimate
+
+        Returns:
+            Nowcast
+        """
+        design = MixDesign(y_in, x_in, xlag, ylag, horizon)
+        y, yl, x, _, _, _ = design.window(start_date, y_in.dropna().index[-1])
+
+        res = estimate(y, yl, x, poly=poly, **kwargs)
+
+        return cls(res, y_in, x_in, xlag, ylag, horizon, poly=poly)
+
+    def update(self, values, regressor=0):
+        """
+        Append new high-frequency observations and update the forecast
+
+        Observations past the last one used for the target period are ignored.
+
+        Args:
+            values (float or array): New observation(s) of the regressor, oldest first
+            regressor (int): Position of the regressor, for models with several
+
+        Returns:
+            float: Updated forecast
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        values = values[:max(0, self._cutoffs[regressor] + 1 - self._counts[regressor])]
+
+        if len(values):
+            window = self._windows[regressor]
+            window = np.concatenate([values[::-1], window])[:len(window)]
+
+            self._windows[regressor] = window
+            self._counts[regressor] += len(values)
+            self._contributions[regressor] = np.dot(self._weights[regressor], window)
+
+        return self.value
+
+    @property
+    def value(self):
+        """
+        Current forecast for the target period
+        """
+        return self._base + np.dot(self._slopes, self._contributions)
+
+    @property
+    def missing(self):
+        """
+        Number of high-frequency periods of each regressor not yet observed for the target period
+        """
+        return [int(max(0, cutoff + 1 - count)) for cutoff, count in zip(self._cutoffs, self._counts)]
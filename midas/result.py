@@ -0,0 +1,101 @@
+import numpy as np
+
+from .cache import _describe
+from .fit import ssr, jacobian, unpack_params
+
+
+class FitResult(object):
+    """
+    Compact result of a MIDAS fit, returned by estimate(compact=True)
+
+    Keeps the parameters and a few statistics in slots instead of the optimizer's full
+    result, whose residuals and nobs x nparams Jacobian add up when thousands of fits are
+    kept.  The residuals, Jacobian and lag weights are recomputed from the data when they
+    are asked for; the result only holds references to the data arrays, which are views
+    of the caller's, not copies.
+
+    It has the attributes of OptimizeResult that the rest of the package uses (x, cost,
+    nfev, status, success), so it can be passed to forecast and Nowcast.
+
+    Args:
+        params (array): Fitted parameters
+        ssr (float): Sum of squared residuals
+        nfev (int): Number of function evaluations
+        status (int): Optimizer status, as in least_squares
+        poly (str or WeightMethod): Weighting polynomial of the fit, which forecast and Nowcast accept as poly
+        data (tuple): (y, yl, x, weight_method) the model was fitted to, for the diagnostics
+    """
+    __slots__ = ('params', 'ssr', 'nfev', 'status', 'poly', '_data')
+
+    def __init__(self, params, ssr, nfev, status, poly, data=None):
+        self.params = params
+        self.ssr = ssr
+        self.nfev = nfev
+        self.status = status
+        self.poly = poly
+        self._data = data
+
+    @classmethod
+    def from_optimize(cls, res, weight_method, data=None):
+        """
+        Compact copy of an OptimizeResult from estimate_array with weight_method
+        """
+        return cls(res.x, 2 * res.cost, res.nfev, res.status, weight_method, data)
+
+    def __getstate__(self):
+        # The data stay with the caller
+        return self.params, self.ssr, self.nfev, self.status, self.poly
+
+    def __setstate__(self, state):
+        self.params, self.ssr, self.nfev, self.status, self.poly = state
+        self._data = None
+
+    def __repr__(self):
+        return 'FitResult(params={}, ssr={:.6g}, nfev={}, status={}, poly={})'.format(
+            np.array2string(np.asarray(self.params), precision=6), self.ssr, self.nfev, self.status,
+            self.poly if isinstance(self.poly, str) else _describe(self.poly))
+
+    @property
+    def x(self):
+        return self.params
+
+    @property
+    def cost(self):
+        return 0.5 * self.ssr
+
+    @property
+    def success(self):
+        return self.status > 0
+
+    @property
+    def fun(self):
+        """
+        Residuals, recomputed from the data
+        """
+        y, yl, x, weight_method = self._fitted_data()
+
+        return ssr(self.params, x, y, yl, weight_method)
+
+    @property
+    def jac(self):
+        """
+        Jacobian of the residuals with respect to the parameters, recomputed from the data
+        """
+        y, yl, x, weight_method = self._fitted_data()
+
+        return jacobian(self.params, x, y, yl, weight_method)
+
+    @property
+    def weights(self):
+        """
+        Fitted lag weights
+        """
+        y, yl, x, weight_method = self._fitted_data()
+
+        return weight_method.weights(x.shape[1], unpack_params(self.params, weight_method)[2])
+
+    def _fitted_data(self):
+        if self._data is None:
+            raise ValueError('The diagnostics need the data, which unpickled results do not keep')
+
+        return self._data
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def save(data, path, meta=None):
+    """
+    Write a time series to a columnar store that can be memory-mapped by load
+
+    The store is a directory holding the dates as int64 nanoseconds, the values as a
+    float64 array with each column contiguous, and the names in a small JSON file.  It
+    is written to a temporary directory and moved into place, so processes loading the
+    store never see a partial one.
+
+    Args:
+        data (Series or DataFrame): Data with a DatetimeIndex
+        path (str): Directory of the store; replaced if it exists
+        meta (dict): Extra entries for the store's JSON metadata
+    """
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+
+    meta = dict(meta or {}, series=isinstance(data, pd.Series), columns=[str(c) for c in frame.columns],
+                index_name=frame.index.name)
+
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+    np.save(os.path.join(tmp, 'index.npy'), pd.DatetimeIndex(frame.index).as_unit('ns').asi8)
+    np.save(os.path.join(tmp, 'values.npy'), np.asfortranarray(frame.values, dtype=float))
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another process wrote the same store first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load(path, mmap=True):
+    """
+    Read a store written by save
+
+    With mmap the values and dates are memory-mapped read-only rather than read: the
+    returned object is a view of the file, so processes loading the same store share
+    one copy of the data in the page cache, and mix_freq builds its lag matrices from
+    strided views of it.  Lazy designs (lazy=True in rolling and recursive) on the mapped
+    data pickle a reference to the file instead of the values, so their n_jobs workers
+    map the same pages too; the loaded Series itself, and the lag matrix of other
+    designs, are copied when pickled.
+
+    Args:
+        path (str): Directory of the store
+        mmap (bool): Map the arrays instead of reading them into memory
+
+    Returns:
+        Series or DataFrame
+    """
+    mode = 'r' if mmap else None
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    dates = np.load(os.path.join(path, 'index.npy'), mmap_mode=mode)
+    values = np.load(os.path.join(path, 'values.npy'), mmap_mode=mode)
+
+    index = pd.DatetimeIndex(np.asarray(dates).view('M8[ns]'), name=meta['index_name'], copy=False)
+
+    if meta['series']:
+        return pd.Series(np.asarray(values)[:, 0], index=index, name=meta['columns'][0], copy=False)
+
+    return pd.DataFrame(np.asarray(values), index=index, columns=meta['columns'], copy=False)
+
+
+def load_csv(path, cache_dir=None, **kwargs):
+    """
+    Read a CSV file of time series through a store, so it is only parsed once
+
+    The first call parses the file with pandas.read_csv and saves the result; later
+    calls with the same arguments load the store, memory-mapped, until the CSV file
+    changes.
+
+    Args:
+        path (str): CSV file
+        cache_dir (str): Directory for the stores; defaults to .midas_store next to the file
+        **kwargs: Passed to pandas.read_csv, which must give a DatetimeIndex (e.g.
+            index_col=0, parse_dates=True)
+
+    Returns:
+        DataFrame (or Series, with squeeze=True for single-column files)
+    """
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), '.midas_store')
+
+    squeeze = kwargs.pop('squeeze', False)
+
+    stat = os.stat(path)
+    source = {'source_mtime': stat.st_mtime_ns, 'source_size': stat.st_size}
+
+    key = hashlib.sha1(repr((path, sorted(kwargs.items()))).encode()).hexdigest()[:16]
+    store = os.path.join(cache_dir, '{}-{}'.format(os.path.basename(path), key))
+
+    data = None
+    try:
+        with open(os.path.join(store, 'meta.json')) as f:
+            meta = json.load(f)
+        if all(meta.get(k) == v for k, v in source.items()):
+            data = load(store)
+    except (OSError, ValueError):
+        pass
+
+    if data is None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        save(pd.read_csv(path, **kwargs), store, meta=source)
+
+        data = load(store)
+
+    if squeeze and len(data.columns) == 1:
+        return data.iloc[:, 0]
+
+    return data
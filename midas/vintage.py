@@ -0,0 +1,192 @@
+import functools
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+from pandas.tseries.frequencies import to_offset
+
+from .adl import estimate, rmse, _map
+from .mix import MixDesign, data_freq
+from .nowcast import Nowcast
+
+
+def read_vintages(path, series=None):
+    """
+    Read an ALFRED-style file of data vintages
+
+    Each column after the observation dates holds one vintage of a series, named
+    SERIES_YYYYMMDD after the date on which that vintage was published.
+
+    Args:
+        path (str): Path of the file, comma- or tab-separated
+        series (str): Series to keep, for files holding the vintages of several
+
+    Returns:
+        DataFrame: Observation dates by vintage dates, with the vintages in date order and
+        the series name as the name of the columns
+    """
+    data = pd.read_csv(path, sep=None, engine='python', index_col=0, parse_dates=True, na_values='.')
+
+    matches = [re.match(r'(.+)_(\d{8})$', str(column)) for column in data.columns]
+    if not all(matches):
+        raise ValueError('Vintage columns must be named SERIES_YYYYMMDD')
+
+    names = set(m.group(1) for m in matches)
+    if series is None and len(names) > 1:
+        raise ValueError('File holds several series ({}); choose one'.format(', '.join(sorted(names))))
+
+    keep = [m.group(1) == series or series is None for m in matches]
+
+    vintages = data.loc[:, keep]
+    vintages.columns = pd.DatetimeIndex([pd.Timestamp(m.group(2)) for m, k in zip(matches, keep) if k],
+                                        name=series or names.pop())
+
+    return vintages.sort_index(axis=1)
+
+
+def vintage_at(vintages, date):
+    """
+    Latest vintage published on or before date
+
+    Args:
+        vintages (DataFrame): Observation dates by vintage dates
+        date (date): Forecast origin
+
+    Returns:
+        Timestamp: Vintage date
+    """
+    position = vintages.columns.searchsorted(date, side='right') - 1
+    if position < 0:
+        raise ValueError('No vintage was published by {}'.format(date))
+
+    return vintages.columns[position]
+
+
+def realtime(y_vintages, x_vintages, start_date, xlag, ylag, horizon, forecast_horizon=1, poly='beta',
+             origins=None, actuals=None, n_jobs=1, executor=None, **kwargs):
+    """
+    Real-time recursive evaluation: at each forecast origin the model is fitted and used
+    with the data vintages that had been published by then
+
+    The estimation window starts at start_date and ends at the last low-frequency value in
+    the origin's vintage; the forecast is for forecast_horizon periods after it, using the
+    high-frequency data available at the origin, realigned as in Nowcast if they are
+    incomplete.
+
+    Origins whose vintages only differ in data the fit doesn't use share one alignment and
+    estimation: the fit is keyed by the content of the low-frequency vintage and of the
+    high-frequency history up to its last date.  Typically many high-frequency releases
+    fall between two low-frequency ones and add observations without touching that
+    history, so the number of fits is close to the number of distinct low-frequency
+    vintages rather than the number of origins.
+
+    Args:
+        y_vintages (DataFrame): Vintages of the low-frequency dependent variable, as returned by read_vintages
+        x_vintages (DataFrame): Vintages of the high-frequency regressor
+        start_date: Date on which to start every estimation
+        xlag (int or str): Number of high frequency lags
+        ylag (int or str): Number of low-frequency lags
+        horizon (int):
+        forecast_horizon (int): Number of low-frequency periods past the last observed value to forecast
+        poly (str): Weighting polynomial
+        origins (list): Forecast origins; defaults to every vintage date once both series are published
+        actuals (Series): Values the forecasts are evaluated against; defaults to the latest low-frequency vintage
+        n_jobs (int): Number of worker processes used for the fits; -1 uses all cores
+        executor (concurrent.futures.Executor): Fit on this executor instead
+        **kwargs: Passed to estimate
+
+    Returns:
+        rmse (float64), and a DataFrame indexed by origin with the target date, predicted and
+        target values, the vintages used and the number of function evaluations of the fit
+    """
+    if origins is None:
+        first = max(y_vintages.columns[0], x_vintages.columns[0])
+        origins = y_vintages.columns.union(x_vintages.columns)
+        origins = origins[origins >= first]
+    origins = pd.DatetimeIndex(origins)
+
+    if actuals is None:
+        actuals = y_vintages.iloc[:, -1]
+
+    y_observed = _Observed(y_vintages)
+    x_observed = _Observed(x_vintages)
+
+    cases = []
+    fits = {}
+    for origin in origins:
+        y_vintage = vintage_at(y_vintages, origin)
+        x_vintage = vintage_at(x_vintages, origin)
+
+        y_in = y_observed[y_vintage]
+        x_in = x_observed[x_vintage]
+
+        key = (_digest(y_in), _history_key(x_in, y_in.index[-1], horizon))
+        fits.setdefault(key, (y_in, x_in))
+
+        cases.append((origin, y_vintage, x_vintage, key))
+
+    fit = functools.partial(_fit_vintage, start_date=start_date, xlag=xlag, ylag=ylag, horizon=horizon, poly=poly,
+                            estimate_kwargs=kwargs)
+    results = dict(zip(fits.keys(), _map(fit, list(fits.values()), n_jobs, executor)))
+
+    rows = []
+    for origin, y_vintage, x_vintage, key in cases:
+        y_in = y_observed[y_vintage]
+        x_in = x_observed[x_vintage]
+
+        target_date = y_in.index[-1] + forecast_horizon * to_offset(data_freq(y_in))
+
+        res = results[key]
+        nowcast = Nowcast(res, y_in, x_in, xlag, ylag, horizon, poly=poly, target_date=target_date)
+
+        rows.append((target_date, nowcast.value, actuals.get(target_date, np.nan), y_vintage, x_vintage, res.nfev))
+
+    table = pd.DataFrame(rows, index=origins,
+                         columns=['target_date', 'preds', 'targets', 'y_vintage', 'x_vintage', 'nfev'])
+    evaluated = table.targets.notnull()
+
+    return rmse(table.preds[evaluated], table.targets[evaluated]), table
+
+
+def _fit_vintage(data, start_date=None, xlag=None, ylag=None, horizon=None, poly='beta', estimate_kwargs=None):
+    y_in, x_in = data
+
+    design = MixDesign(y_in, x_in, xlag, ylag, horizon)
+    y, yl, x, _, _, _ = design.window(start_date, y_in.index[-1])
+
+    return estimate(y, yl, x, poly=poly, **(estimate_kwargs or {}))
+
+
+class _Observed(dict):
+    """
+    Observed values of each vintage, taken out of the vintage table on first use
+    """
+    def __init__(self, vintages):
+        super(_Observed, self).__init__()
+        self.vintages = vintages
+
+    def __missing__(self, vintage):
+        series = self.vintages[vintage].dropna()
+        series.name = self.vintages.columns.name
+        self[vintage] = series
+
+        return series
+
+
+def _history_key(x_in, last_date, horizon):
+    """
+    Digest of the high-frequency observations that the lag matrix uses up to last_date,
+    and whether the data extend to it (which decides if last_date is in the sample)
+    """
+    used = x_in.index.searchsorted(last_date, side='left') - horizon + 1
+
+    return _digest(x_in.iloc[:max(used, 0)]), bool(x_in.index[-1] >= last_date)
+
+
+def _digest(series):
+    h = hashlib.sha1(series.index.asi8.tobytes())
+    h.update(np.ascontiguousarray(series.values, dtype=float).tobytes())
+
+    return h.hexdigest()
@@ -1,23 +1,122 @@
 import numpy as np
 
+from .fit import jacobian_wx
 
-def polynomial_weights(poly):
-    poly_class = {
-        'beta': BetaWeights(1., 5.),
-        'beta_nz': BetaWeights(1., 5.),
-        'expalmon': ExpAlmonWeights(-1., 0.)
-    }
 
-    return poly_class[poly]
+def polynomial_weights(poly, nlags=None):
+    """
+    Look up the weight method for a polynomial name
+
+    The instances are shared: weight methods never change their own state when
+    weighting, so one object can be used by concurrent estimations.
+
+    Args:
+        poly (str, WeightMethod or list): Polynomial name or weight method, or one per regressor
+        nlags (int or list): Number of lags, which weight methods whose number of parameters
+            depends on it (U-MIDAS) need.  With a list, one per regressor, a StackedWeights
+            is returned.
+    """
+    if isinstance(poly, StackedWeights):
+        # Already set up for its regressors' lags
+        return poly
+
+    if isinstance(nlags, (list, tuple)):
+        polys = poly if isinstance(poly, (list, tuple)) else [poly] * len(nlags)
+
+        return StackedWeights([_lookup(p).with_lags(n) for p, n in zip(polys, nlags)], nlags)
+
+    if nlags is None:
+        return _lookup(poly)
+
+    return _lookup(poly).with_lags(nlags)
+
+
+def _lookup(poly):
+    return poly if isinstance(poly, WeightMethod) else POLYNOMIALS[poly]
 
 
 class WeightMethod(object):
+    """
+    Base class for lag weighting polynomials
+
+    The parameters passed to weights and x_weighted are never stored on the object;
+    the theta attributes are only defaults for calling weights without parameters.
+    """
+    num_regressors = 1
+    linear = False
+
     def __init__(self):
         pass
 
-    def weights(self):
+    def weights(self, nlags, params=None):
         pass
 
+    def with_lags(self, nlags):
+        """
+        Weight method for nlags lags; the same object unless the parameters depend on nlags
+        """
+        return self
+
+    @property
+    def param_regressor(self):
+        """
+        Index of the regressor that each weight parameter belongs to
+        """
+        return np.zeros(self.num_params, dtype=int)
+
+    def x_weighted(self, x, params, return_weights=False):
+        """
+        Weighted sum of the high-frequency lags
+
+        Args:
+            x (array): nobs x nlags matrix of lags, or a LagOperator
+            params (array): Weight parameters
+            return_weights (bool): Also return the weight vector
+
+        Returns:
+            array: nobs weighted regressor, or (weighted regressor, weights) if return_weights
+        """
+        w = self.weights(x.shape[1], params)
+
+        if return_weights:
+            return x.dot(w), w
+
+        return x.dot(w)
+
+    def theta_grid(self, nlags):
+        """
+        Candidate weight parameters for a multi-start search (see estimate)
+
+        Returns:
+            array: ncandidates x num_params array
+        """
+        return np.atleast_2d(self.init_params())
+
+    def weights_grid(self, nlags, grid):
+        """
+        Weights for each row of grid, as the columns of one matrix
+
+        Returns:
+            array: nlags x len(grid) array
+        """
+        return np.column_stack([self.weights(nlags, theta) for theta in grid])
+
+    def weights_jacobian_grid(self, nlags, grid):
+        """
+        weights_jacobian for each row of grid
+
+        Returns:
+            array: nlags x len(grid) x num_params array
+        """
+        return np.stack([self.weights_jacobian(nlags, theta) for theta in grid], axis=1)
+
+
+def _product(*values):
+    """
+    Rows of every combination of the values
+    """
+    return np.stack(np.meshgrid(*values, indexing='ij'), axis=-1).reshape(-1, len(values))
+
 
 class BetaWeights(WeightMethod):
     def __init__(self, theta1, theta2, theta3=None):
@@ -25,28 +124,86 @@ class BetaWeights(WeightMethod):
         self.theta2 = theta2
         self.theta3 = theta3
 
-    def weights(self, nlags):
+    def weights(self, nlags, params=None):
         """ Evenly-spaced beta weights
+
+        Args:
+            nlags (int): Number of lags
+            params (array): theta1, theta2; defaults to the object's thetas
+        """
+        theta1, theta2 = (self.theta1, self.theta2) if params is None else params
+
+        eps = np.spacing(1)
+        u = np.linspace(eps, 1.0 - eps, nlags)
+
+        beta_vals = u ** (theta1 - 1) * (1 - u) ** (theta2 - 1)
+
+        beta_vals = beta_vals / beta_vals.sum()
+
+        if self.theta3 is not None:
+            w = beta_vals + self.theta3
+            return w / w.sum()
+
+        return beta_vals
+
+    def weights_jacobian(self, nlags, params):
         """
+        Derivatives of the beta weights with respect to theta1 and theta2
+
+        Returns:
+            array: nlags x 2 array of derivatives
+        """
+        theta1, theta2 = params
+
         eps = np.spacing(1)
         u = np.linspace(eps, 1.0 - eps, nlags)
 
-        beta_vals = u ** (self.theta1 - 1) * (1 - u) ** (self.theta2 - 1)
+        beta_vals = u ** (theta1 - 1) * (1 - u) ** (theta2 - 1)
+        w = beta_vals / beta_vals.sum()
+
+        dlog = np.column_stack([np.log(u), np.log(1 - u)])
+        jac = w[:, None] * (dlog - np.dot(w, dlog))
+
+        if self.theta3 is not None:
+            return jac / (1 + nlags * self.theta3)
+
+        return jac
+
+    def theta_grid(self, nlags):
+        """
+        Shapes from declining to hump-shaped to rising, including the default start
+        """
+        return _product([1., 1.5, 2., 3., 5.], [1., 2., 5., 10., 20., 50.])
+
+    def weights_grid(self, nlags, grid):
+        eps = np.spacing(1)
+        u = np.linspace(eps, 1.0 - eps, nlags)[:, None]
 
-        beta_vals = beta_vals / sum(beta_vals)
+        with np.errstate(over='ignore', invalid='ignore'):
+            beta_vals = u ** (grid[:, 0] - 1) * (1 - u) ** (grid[:, 1] - 1)
+            beta_vals = beta_vals / beta_vals.sum(axis=0)
 
         if self.theta3 is not None:
             w = beta_vals + self.theta3
-            return w / sum(w)
+            return w / w.sum(axis=0)
 
         return beta_vals
 
-    def x_weighted(self, x, params):
-        self.theta1, self.theta2 = params
+    def weights_jacobian_grid(self, nlags, grid):
+        eps = np.spacing(1)
+        u = np.linspace(eps, 1.0 - eps, nlags)
+
+        with np.errstate(over='ignore', invalid='ignore'):
+            beta_vals = u[:, None] ** (grid[:, 0] - 1) * (1 - u[:, None]) ** (grid[:, 1] - 1)
+            w = beta_vals / beta_vals.sum(axis=0)
 
-        w = self.weights(x.shape[1])
+        dlog = np.column_stack([np.log(u), np.log(1 - u)])
+        jac = w[:, :, None] * (dlog[:, None, :] - np.dot(w.T, dlog)[None, :, :])
 
-        return np.dot(x, w), np.tile(w.T, (x.shape[1], 1))
+        if self.theta3 is not None:
+            return jac / (1 + nlags * self.theta3)
+
+        return jac
 
     @property
     def num_params(self):
@@ -62,24 +219,63 @@ class ExpAlmonWeights(WeightMethod):
         self.theta1 = theta1
         self.theta2 = theta2
 
-    def weights(self, nlags):
+    def weights(self, nlags, params=None):
         """
         Exponential Almon weights
 
+        Args:
+            nlags (int): Number of lags
+            params (array): theta1, theta2; defaults to the object's thetas
+
         Returns:
             array: Array of weights
 
         """
+        theta1, theta2 = (self.theta1, self.theta2) if params is None else params
+
+        ilag = np.arange(1, nlags + 1)
+        z = np.exp(theta1 * ilag + theta2 * ilag ** 2)
+        return z / z.sum()
+
+    def weights_jacobian(self, nlags, params):
+        """
+        Derivatives of the exponential Almon weights with respect to theta1 and theta2
+
+        Returns:
+            array: nlags x 2 array of derivatives
+        """
+        theta1, theta2 = params
+
         ilag = np.arange(1, nlags + 1)
-        z = np.exp(self.theta1 * ilag + self.theta2 * ilag ** 2)
-        return z / sum(z)
+        z = np.exp(theta1 * ilag + theta2 * ilag ** 2)
+        w = z / z.sum()
 
-    def x_weighted(self, x, params):
-        self.theta1, self.theta2 = params
+        dlog = np.column_stack([ilag, ilag ** 2])
+        return w[:, None] * (dlog - np.dot(w, dlog))
+
+    def theta_grid(self, nlags):
+        """
+        Exponents of up to +-10 over the lags (theta1 in units of 1 / nlags and theta2 of
+        1 / nlags ** 2), including the default start
+        """
+        grid = _product([-10., -5., -2., 0., 2., 5., 10.], [-20., -10., -5., 0., 5., 10.])
+        grid /= [nlags, nlags ** 2]
 
-        w = self.weights(x.shape[1])
+        return np.vstack([self.init_params(), grid])
 
-        return np.dot(x, w), np.tile(w.T, (x.shape[1], 1))
+    def weights_grid(self, nlags, grid):
+        ilag = np.arange(1, nlags + 1)[:, None]
+
+        with np.errstate(over='ignore', invalid='ignore'):
+            z = np.exp(grid[:, 0] * ilag + grid[:, 1] * ilag ** 2)
+            return z / z.sum(axis=0)
+
+    def weights_jacobian_grid(self, nlags, grid):
+        ilag = np.arange(1, nlags + 1)
+        w = self.weights_grid(nlags, grid)
+
+        dlog = np.column_stack([ilag, ilag ** 2])
+        return w[:, :, None] * (dlog[:, None, :] - np.dot(w.T, dlog)[None, :, :])
 
     @property
     def num_params(self):
@@ -88,3 +284,229 @@ class ExpAlmonWeights(WeightMethod):
     @staticmethod
     def init_params():
         return np.array([-1., 0.])
+
+
+class LinearWeights(WeightMethod):
+    """
+    Base class for weights that are linear in their parameters, w = basis(nlags) * params
+
+    The weighted regressor is then linear in the parameters too, so the model is fitted
+    by a single least-squares solve instead of an iterative optimization (see
+    estimate).  The weights are not normalized to sum to one: their level takes the
+    place of the slope, which is fixed at 1.
+    """
+    linear = True
+
+    def basis(self, nlags):
+        pass
+
+    def weights(self, nlags, params=None):
+        if params is None:
+            params = self.init_params()
+
+        return np.dot(self.basis(nlags), params)
+
+    def weights_jacobian(self, nlags, params):
+        return self.basis(nlags)
+
+    def x_basis(self, x):
+        """
+        Lags projected on the basis, the columns of the linear model that params multiply
+
+        Returns:
+            array: nobs x num_params array
+        """
+        return x.dot(self.basis(x.shape[1]))
+
+
+class AlmonWeights(LinearWeights):
+    """
+    Polynomial distributed lag (Almon) weights, w_i = theta_0 + theta_1 i + ... + theta_d i^d
+
+    Args:
+        degree (int): Degree of the polynomial
+    """
+    def __init__(self, degree=2):
+        self.degree = degree
+
+    def basis(self, nlags):
+        """
+        Powers of the lag number, scaled to [0, 1] to keep the least-squares problem well conditioned
+
+        Returns:
+            array: nlags x (degree + 1) array
+        """
+        ilag = np.arange(1, nlags + 1) / nlags
+
+        return ilag[:, None] ** np.arange(self.degree + 1)
+
+    @property
+    def num_params(self):
+        return self.degree + 1
+
+    def init_params(self):
+        return np.concatenate([[1.], np.zeros(self.degree)])
+
+
+class UnrestrictedWeights(LinearWeights):
+    """
+    Unrestricted MIDAS (U-MIDAS): a separate coefficient for every lag
+
+    Args:
+        nlags (int): Number of lags; the weight method is bound to it by with_lags
+    """
+    def __init__(self, nlags=None):
+        self.nlags = nlags
+
+    def with_lags(self, nlags):
+        return UnrestrictedWeights(nlags)
+
+    def basis(self, nlags):
+        return np.eye(nlags)
+
+    def x_basis(self, x):
+        return np.asarray(x)
+
+    @property
+    def num_params(self):
+        if self.nlags is None:
+            raise ValueError('U-MIDAS weights need the number of lags')
+
+        return self.nlags
+
+    def init_params(self):
+        return np.full(self.num_params, 1. / self.num_params)
+
+
+class StackedWeights(WeightMethod):
+    """
+    Separate weight polynomials for several high-frequency regressors
+
+    The regressors' lag matrices are stacked side by side in one matrix, and the
+    parameters of the polynomials are concatenated in the same order.  x_weighted
+    returns one weighted column per regressor.
+
+    Args:
+        weight_methods (list): Weight method for each regressor
+        nlags (list): Number of lags of each regressor
+    """
+    def __init__(self, weight_methods, nlags):
+        self.weight_methods = list(weight_methods)
+        self.nlags = list(nlags)
+
+        self._lag_offsets = np.cumsum([0] + self.nlags)
+        self._param_offsets = np.cumsum([0] + [wm.num_params for wm in self.weight_methods])
+
+        self.linear = all(wm.linear for wm in self.weight_methods)
+        if not self.linear and any(wm.linear for wm in self.weight_methods):
+            raise ValueError('Linear and nonlinear weights cannot be combined')
+
+    def _blocks(self, params):
+        for i, wm in enumerate(self.weight_methods):
+            yield (i, wm,
+                   slice(self._lag_offsets[i], self._lag_offsets[i + 1]),
+                   params[self._param_offsets[i]:self._param_offsets[i + 1]])
+
+    def weights(self, nlags, params=None):
+        """
+        Block-diagonal weight matrix
+
+        Args:
+            nlags (int): Total number of lags, sum(self.nlags)
+            params (array): Concatenated weight parameters
+
+        Returns:
+            array: nlags x num_regressors array
+        """
+        if params is None:
+            params = self.init_params()
+
+        w = np.zeros((nlags, self.num_regressors))
+        for i, wm, lags, theta in self._blocks(params):
+            w[lags, i] = wm.weights(lags.stop - lags.start, theta)
+
+        return w
+
+    def x_weighted(self, x, params, return_weights=False):
+        """
+        Weighted sums of each regressor's lags
+
+        Returns:
+            array: nobs x num_regressors array, and the weight matrix if return_weights
+        """
+        xw = np.empty((len(x), self.num_regressors))
+        for i, wm, lags, theta in self._blocks(params):
+            xw[:, i] = wm.x_weighted(x[:, lags], theta)
+
+        if return_weights:
+            return xw, self.weights(x.shape[1], params)
+
+        return xw
+
+    def x_weighted_jacobian(self, x, params):
+        """
+        Derivatives of each weighted regressor with respect to its own parameters
+
+        Column j is the derivative of regressor param_regressor[j] with respect to
+        parameter j; each block only touches its own lag columns, so the cost is
+        linear in the number of regressors.
+
+        Returns:
+            array: nobs x num_params array
+        """
+        return np.hstack([jacobian_wx(x[:, lags], theta, wm) for i, wm, lags, theta in self._blocks(params)])
+
+    def x_basis(self, x):
+        """
+        Each regressor's lags projected on its basis, for linear weights
+
+        Returns:
+            array: nobs x num_params array
+        """
+        return np.hstack([wm.x_basis(x[:, lags]) for i, wm, lags, theta in self._blocks(np.empty(self.num_params))])
+
+    def theta_grid(self, nlags):
+        """
+        Every combination of the regressors' candidates, so the grid grows as their product
+        """
+        grids = [wm.theta_grid(n) for wm, n in zip(self.weight_methods, self.nlags)]
+        rows = _product(*[np.arange(len(g)) for g in grids]).astype(int)
+
+        return np.hstack([g[rows[:, i]] for i, g in enumerate(grids)])
+
+    def weights_grid(self, nlags, grid):
+        """
+        Block-diagonal weight matrices of the candidates, side by side
+
+        Returns:
+            array: nlags x (len(grid) * num_regressors) array, candidate-major
+        """
+        w = np.zeros((nlags, len(grid), self.num_regressors))
+        for i, wm, lags, theta in self._blocks(grid.T):
+            w[lags, :, i] = wm.weights_grid(lags.stop - lags.start, theta.T)
+
+        return w.reshape((nlags, -1))
+
+    @property
+    def num_regressors(self):
+        return len(self.weight_methods)
+
+    @property
+    def num_params(self):
+        return int(self._param_offsets[-1])
+
+    @property
+    def param_regressor(self):
+        return np.repeat(np.arange(self.num_regressors), np.diff(self._param_offsets))
+
+    def init_params(self):
+        return np.concatenate([wm.init_params() for wm in self.weight_methods])
+
+
+POLYNOMIALS = {
+    'beta': BetaWeights(1., 5.),
+    'beta_nz': BetaWeights(1., 5.),
+    'expalmon': ExpAlmonWeights(-1., 0.),
+    'almon': AlmonWeights(2),
+    'umidas': UnrestrictedWeights()
+}
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from midas import mix
+from midas.adl import estimate, rolling
+from midas.cache import FitCache
+
+
+def test_estimate_cache(tmp_path, gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, '3m', 1, 3,
+                                         start_date='1985-01-01', end_date='2009-01-01')
+
+    cache = FitCache(str(tmp_path))
+    res = estimate(y, yl, x, cache=cache)
+    assert len(os.listdir(str(tmp_path))) == 1
+
+    cached = estimate(y, yl, x, cache=cache)
+    np.testing.assert_array_equal(cached.x, res.x)
+    assert len(os.listdir(str(tmp_path))) == 1
+
+    # Other data or settings are fitted again
+    estimate(y[1:], yl[1:], x[1:], cache=cache)
+    estimate(y, yl, x, poly='expalmon', cache=cache)
+    estimate(y, yl, x, profile=True, cache=cache)
+    assert len(os.listdir(str(tmp_path))) == 4
+
+
+def test_cache_eviction(tmp_path, gdp_data, pay_data):
+    cache = FitCache(str(tmp_path))
+    rmse, _ = rolling(gdp_data.gdp, pay_data.pay, '1985-01-01', '2009-01-01', '3m', 1, 3, cache=cache)
+
+    entries = sorted(os.listdir(str(tmp_path)))
+    size = cache.size()
+    assert size > 0
+
+    # Re-running only reads the cache, and refreshes the entries
+    assert rolling(gdp_data.gdp, pay_data.pay, '1985-01-01', '2009-01-01', '3m', 1, 3, cache=cache)[0] == rmse
+    assert sorted(os.listdir(str(tmp_path))) == entries
+
+    small = FitCache(str(tmp_path), max_bytes=size // 2)
+    y, yl, x, _, _, _ = mix.mix_freq(gdp_data.gdp, pay_data.pay, '3m', 1, 3,
+                                     start_date='1990-01-01', end_date='2000-01-01')
+    estimate(y, yl, x, cache=small)
+    assert small.size() <= size // 2
+    assert len(os.listdir(str(tmp_path))) < len(entries)
@@ -0,0 +1,55 @@
+import datetime
+import numpy as np
+
+from midas import mix
+from midas.fit import profile_ssr, profile_jacobian, qr_append, grid_ssr, linear_params, pack_params, ssr
+from midas.weights import polynomial_weights
+
+
+def test_profile_jacobian(gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 6, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    weight_method = polynomial_weights('beta')
+    theta = np.array([1.3, 3.7])
+    eps = 1e-6
+
+    jac = profile_jacobian(theta, x.values, y.values, yl.values, weight_method)
+
+    for i in range(2):
+        dp = theta + eps / 2 * np.eye(2)[i]
+        dm = theta - eps / 2 * np.eye(2)[i]
+        fd = (profile_ssr(dp, x.values, y.values, yl.values, weight_method) -
+              profile_ssr(dm, x.values, y.values, yl.values, weight_method)) / eps
+
+        assert np.allclose(jac[:, i], fd, atol=1e-7)
+
+
+def test_grid_ssr(gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, [pay_data.pay, pay_data.pay.shift(1)], [6, 3], 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    for weight_method in (polynomial_weights('expalmon', 6), polynomial_weights(['beta', 'expalmon'], [6, 3])):
+        grid = weight_method.theta_grid(x.shape[1])[::7]
+
+        expected = []
+        for theta in grid:
+            c = linear_params(theta, x.values, y.values, yl.values, weight_method)
+            resid = ssr(pack_params(c, theta, weight_method), x.values, y.values, yl.values, weight_method)
+            expected.append(np.dot(resid, resid))
+
+        assert np.allclose(grid_ssr(grid, x.values, y.values, yl.values, weight_method), expected)
+
+
+def test_qr_append():
+    a = np.random.default_rng(0).normal(size=(30, 5))
+
+    r = np.zeros((5, 5))
+    for rows in (a[:3], a[3:4], a[4:20], a[20:20], a[20:]):
+        r = qr_append(r, rows)
+
+    expected = np.linalg.qr(a, mode='r')
+
+    assert np.allclose(np.abs(r), np.abs(expected))
+    assert np.allclose(np.dot(r.T, r), np.dot(a.T, a))
@@ -0,0 +1,53 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from midas import mix
+from midas.adl import estimate, midas_adl
+from midas.instrument import Instrument
+
+
+def test_estimate_stages(gdp_data, pay_data):
+    instrument = Instrument()
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1),
+                                         instrument=instrument)
+    res = estimate(y, yl, x, instrument=instrument)
+
+    assert [r['stage'] for r in instrument.records] == ['align', 'init', 'optimize']
+
+    optimize = instrument.records[-1]
+    assert optimize['nfev'] == res.nfev
+    assert optimize['njev'] == res.njev
+    assert optimize['status'] == res.status
+    assert optimize['success']
+    assert not optimize['warm']
+    assert all(r['seconds'] >= 0 for r in instrument.records)
+
+
+def test_midas_adl_instrument(gdp_data, pay_data):
+    rmse, yh_df = midas_adl(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                            datetime.datetime(2009, 1, 1), 3, 1, 1, method='rolling')
+
+    seen = []
+    instrument = Instrument(callback=seen.append)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rmse_i, yh_df_i = midas_adl(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                                    datetime.datetime(2009, 1, 1), 3, 1, 1, method='rolling', executor=executor,
+                                    instrument=instrument)
+
+    assert rmse_i == rmse
+    assert yh_df_i.equals(yh_df)
+    assert seen == instrument.records
+
+    summary = instrument.summary()
+    assert summary.loc['window', 'count'] == len(yh_df)
+    assert summary.loc['optimize', 'nfev'] == yh_df.nfev.sum()
+    assert summary.loc['align', 'count'] == 1
+    assert instrument.records[-1]['stage'] == 'backtest'
+    assert instrument.records[-1]['windows'] == len(yh_df)
+
+    windows = instrument.to_frame().query('stage == "window"')
+    assert windows.stop.is_monotonic_increasing
@@ -1,8 +1,18 @@
 import datetime
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 import numpy as np
+import pandas as pd
 
 from midas import mix
-from midas.adl import estimate, forecast, rolling, fixed_window
+from midas.adl import (estimate, estimate_array, forecast, rolling, recursive, fixed_window, midas_batch,
+                       midas_select, backtest_array, midas_adl)
+from midas.batch import estimate_batch
+from midas.fit import SOLVER_OPTIONS
+from midas.weights import polynomial_weights
 
 
 def test_estimate(gdp_data, pay_data):
@@ -20,6 +30,21 @@ def test_estimate(gdp_data, pay_data):
     assert np.isclose(fc.loc['2011-04-01'].iloc[0], 1.336844, rtol=1e-6)
 
 
+def test_estimate_multistart(gdp_data, pay_data):
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    res = estimate(y, yl, x)
+    res_m = estimate(y, yl, x, multistart=3)
+    res_p = estimate(y, yl, x, multistart=3, profile=True)
+
+    assert res_m.cost <= res.cost + 1e-9
+    assert np.isclose(res_p.cost, res_m.cost)
+    assert res_m.nfev > res.nfev
+
+
 def test_estimate_betanz(gdp_data, pay_data):
 
     y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
@@ -50,6 +75,34 @@ def test_estimate_expalmon(gdp_data, pay_data):
     assert np.isclose(fc.loc['2011-04-01'].iloc[0], 1.306661, rtol=1e-6)
 
 
+def test_estimate_profile(gdp_data, pay_data):
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    res = estimate(y, yl, x, profile=True)
+
+    assert len(res.x) == 5
+
+    fc = forecast(xf, ylf, res)
+
+    assert np.isclose(fc.loc['2011-04-01'].iloc[0], 1.336844, rtol=1e-6)
+
+
+def test_estimate_profile_expalmon(gdp_data, pay_data):
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    res = estimate(y, yl, x, poly='expalmon', profile=True)
+
+    fc = forecast(xf, ylf, res, poly='expalmon')
+
+    assert np.isclose(fc.loc['2011-04-01'].iloc[0], 1.306661, rtol=1e-6)
+
+
 def test_fixed(gdp_data, pay_data):
     fc, rmse_fc = fixed_window(gdp_data.gdp, pay_data.pay,
                                start_date=datetime.datetime(1985,1,1),
@@ -66,3 +119,414 @@ def test_rolling(gdp_data, pay_data):
                           "3m", 1, 1)
 
     assert 0.6 < rmse < 0.7
+
+
+def test_rolling_parallel(gdp_data, pay_data):
+
+    rmse, yh_df = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                          "3m", 1, 1)
+
+    rmse_p, yh_df_p = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, n_jobs=2)
+
+    assert rmse == rmse_p
+    assert yh_df.equals(yh_df_p)
+
+
+def test_recursive_executor(gdp_data, pay_data):
+
+    rmse, yh_df = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                            datetime.datetime(2009, 1, 1), "3m", 1, 1)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rmse_p, yh_df_p = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                                    datetime.datetime(2009, 1, 1), "3m", 1, 1, executor=executor)
+
+    assert rmse == rmse_p
+    assert yh_df.equals(yh_df_p)
+
+
+def test_rolling_warm_start(gdp_data, pay_data):
+
+    rmse, yh_df = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                          "3m", 1, 1)
+
+    rmse_w, yh_df_w = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, warm_start=True)
+
+    assert yh_df.index.equals(yh_df_w.index)
+    assert yh_df_w.nfev.sum() < yh_df.nfev.sum()
+    assert 0.6 < rmse_w < 0.7
+
+
+def test_rolling_warm_start_executor(gdp_data, pay_data):
+    class CountingExecutor(ThreadPoolExecutor):
+        def map(self, fn, items, **kwargs):
+            items = list(items)
+            self.tasks = len(items)
+            return super().map(fn, items, **kwargs)
+
+    with CountingExecutor(max_workers=4) as executor:
+        rmse, yh_df = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, warm_start=True, executor=executor)
+
+    # One contiguous block of windows per worker of the executor
+    assert executor.tasks == 4
+    assert 0.6 < rmse < 0.7
+
+
+def test_estimate_warm_start_fallback(gdp_data, pay_data, monkeypatch):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    weight_method = polynomial_weights('beta', 3)
+
+    monkeypatch.setitem(SOLVER_OPTIONS, 'max_nfev', 15)
+    res = estimate_array(y.values, yl.values, x.values, weight_method)
+    res_w = estimate_array(y.values, yl.values, x.values, weight_method, x0=np.array([0., 0., 1e3, 1e-3, 0.]))
+
+    # The warm start runs out of evaluations, and they are counted with the cold start's
+    assert np.array_equal(res_w.x, res.x)
+    assert res_w.nfev == res.nfev + 15
+
+
+def test_rolling_batch(gdp_data, pay_data):
+
+    rmse, yh_df = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                          "3m", 1, 1, poly='expalmon')
+
+    rmse_b, yh_df_b = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, poly='expalmon', batch=True)
+
+    assert yh_df.index.equals(yh_df_b.index)
+    np.testing.assert_allclose(yh_df_b.preds, yh_df.preds, rtol=1e-5)
+
+    rmse_b, yh_df_b = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, batch=True, n_jobs=2, executor=ThreadPoolExecutor(2))
+
+    assert 0.6 < rmse_b < 0.7
+
+
+@pytest.fixture(scope='module')
+def daily_design():
+    # Quarterly target of the previous quarter's average of a business-daily regressor
+    rng = np.random.default_rng(0)
+    hf_index = pd.date_range('1960-01-01', periods=4 * 66 * 35, freq='B')
+    x_in = pd.Series(rng.normal(size=len(hf_index)), index=hf_index)
+    lf_index = pd.date_range('1960-01-01', hf_index[-1], freq='QS')
+    signal = x_in.rolling(66).mean().shift(1).reindex(lf_index, method='ffill')
+    y_in = (0.5 + 2. * signal + 0.3 * rng.normal(size=len(lf_index))).dropna()
+
+    return mix.MixDesign(y_in, x_in, 66, 1, 1)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize("poly", ['expalmon', 'beta'])
+@pytest.mark.parametrize("length", [40, 60, 80, 100, 120])
+@pytest.mark.parametrize("stride", [1, 4])
+def test_estimate_batch_daily(daily_design, monkeypatch, poly, length, stride):
+    # Some windows crawl along a flat valley until max_nfev; a lower bound keeps the test quick
+    monkeypatch.setitem(SOLVER_OPTIONS, 'max_nfev', 200)
+
+    y, yl, x = daily_design.arrays()
+    weight_method = polynomial_weights(poly, 66)
+    windows = [(start, start + length) for start in range(1, len(y) - length, stride)]
+
+    params, cost, nfev, status = estimate_batch(y, yl, x, windows, weight_method, max_nfev=200)
+
+    costs = [estimate_array(y[start:stop], yl[start:stop], x[start:stop], weight_method).cost
+             for start, stop in windows]
+
+    # Every window takes least_squares' steps, so it ends where estimate_array does
+    np.testing.assert_allclose(cost, costs, rtol=1e-8)
+
+
+def test_rolling_lazy(gdp_data, pay_data):
+
+    rmse, yh_df = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                          "3m", 1, 1)
+
+    rmse_l, yh_df_l = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, lazy=True)
+
+    assert yh_df.index.equals(yh_df_l.index)
+    assert abs(rmse_l - rmse) < 1e-3
+
+    rmse, yh_df = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                          "3m", 1, 1, poly='almon')
+
+    rmse_l, yh_df_l = rolling(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), None,
+                              "3m", 1, 1, poly='almon', lazy=True)
+
+    np.testing.assert_allclose(yh_df_l.preds, yh_df.preds, rtol=1e-8)
+
+
+def test_backtest_array(gdp_data, pay_data):
+    rmse, yh_df = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                            datetime.datetime(2009, 1, 1), 3, 1, 1)
+
+    design = mix.MixDesign(gdp_data.gdp, pay_data.pay, 3, 1, 1)
+    windows = [design.locate(datetime.datetime(1985, 1, 1), end) for end in yh_df.index.shift(-1, freq='QS')]
+
+    y, yl, x = design.arrays()
+    preds, targets, nfev = backtest_array(y, yl, x, windows, polynomial_weights('beta'))
+
+    assert np.allclose(preds, yh_df.preds.values)
+    assert np.array_equal(targets, yh_df.targets.values)
+    assert np.array_equal(nfev, yh_df.nfev.values)
+
+
+def test_estimate_compact(gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    res = estimate(y, yl, x)
+    compact = estimate(y, yl, x, compact=True)
+
+    assert not hasattr(compact, '__dict__')
+    assert np.array_equal(compact.params, res.x)
+    assert np.isclose(compact.ssr, 2 * res.cost)
+    assert compact.nfev == res.nfev and compact.success
+    assert np.allclose(compact.fun, res.fun)
+    assert np.allclose(compact.jac, res.jac)
+    assert np.isclose(compact.weights.sum(), 1.)
+    assert forecast(xf, ylf, compact).equals(forecast(xf, ylf, res))
+
+    # The weight method goes back into forecast as poly
+    compact_array = estimate_array(y.values, yl.values, x.values, polynomial_weights('beta', 3), compact=True)
+    assert compact.poly is compact_array.poly is polynomial_weights('beta', 3)
+    assert forecast(xf, ylf, compact, poly=compact.poly).equals(forecast(xf, ylf, res))
+    assert 'BetaWeights' in repr(compact)
+
+    restored = pickle.loads(pickle.dumps(compact))
+    assert np.array_equal(restored.params, compact.params)
+    with pytest.raises(ValueError):
+        restored.fun
+
+
+def test_recursive_params(gdp_data, pay_data):
+    rmse, yh_df, params = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                                    datetime.datetime(2009, 1, 1), 3, 1, 1, return_params=True)
+
+    assert params.shape == (len(yh_df), 5)
+    assert params.flags.c_contiguous
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=yh_df.index[0] - pd.DateOffset(months=3))
+
+    assert np.allclose(params[0], estimate(y, yl, x).x)
+
+    for kwargs in ({'poly': 'almon'}, {'batch': True, 'n_jobs': 2, 'executor': ThreadPoolExecutor(2)}):
+        result = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                           datetime.datetime(2009, 1, 1), 3, 1, 1, return_params=True, **kwargs)
+        assert len(result[2]) == len(params)
+        assert np.isfinite(result[2]).all()
+
+    assert midas_adl(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), datetime.datetime(2009, 1, 1), 3, 1,
+                     1, return_params=True)[2].shape == (1, 5)
+
+
+def test_estimate_linear(gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 6, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    # U-MIDAS is OLS on the lags
+    res = estimate(y, yl, x, poly='umidas')
+    c = np.linalg.lstsq(np.column_stack([np.ones(len(y)), x.values, yl.values]), y.values, rcond=None)[0]
+
+    assert np.allclose(res.x, np.concatenate([c[:1], [1.], c[1:]]))
+    assert np.isclose(2 * res.cost, ((y.values - np.dot(np.column_stack([np.ones(len(y)), x.values, yl.values]), c))
+                                     ** 2).sum())
+
+    fc = forecast(xf, ylf, res, poly='umidas')
+    assert np.allclose(fc.yfh.values, c[0] + np.dot(xf.values, c[1:7]) + ylf.values[:, 0] * c[7])
+
+    # Ridge shrinks the weights
+    res_ridge = estimate(y, yl, x, poly='umidas', ridge=10.)
+    assert np.abs(res_ridge.x[2:8]).sum() < np.abs(res.x[2:8]).sum()
+
+    # Almon weights are a restricted U-MIDAS, so fit no better
+    res_almon = estimate(y, yl, x, poly='almon')
+    assert len(res_almon.x) == 6
+    assert res.cost <= res_almon.cost
+
+    rmse, yh_df = midas_adl(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1), datetime.datetime(2009, 1, 1),
+                            6, 1, 1, poly='almon', method='recursive')
+    assert (yh_df.nfev == 1).all()
+
+
+def test_recursive_linear_updating(gdp_data, pay_data):
+    design = mix.MixDesign(gdp_data.gdp, pay_data.pay, 12, 2, 1)
+    y, yl, x = design.arrays()
+    windows = [(20, stop) for stop in range(30, len(design) - 1)]
+
+    for poly, ridge in (('umidas', None), ('almon', None), ('umidas', 2.)):
+        weight_method = polynomial_weights(poly, 12)
+
+        preds, targets, nfev = backtest_array(y, yl, x, windows, weight_method, ridge=ridge)
+
+        # Full refits of every window
+        expected = []
+        for start, stop in windows:
+            res = estimate(design.y.iloc[start:stop], design.yl.iloc[start:stop], design.x.iloc[start:stop],
+                           poly=poly, ridge=ridge)
+            expected.append(forecast(design.x.iloc[stop:stop + 1], design.yl.iloc[stop:stop + 1], res,
+                                     poly=poly).yfh.iloc[0])
+
+        assert np.allclose(preds, expected, rtol=1e-9, atol=1e-9)
+        assert np.array_equal(targets, y[[stop for start, stop in windows]])
+
+
+def test_recursive_multiple_horizons(gdp_data, pay_data):
+    rmse, yh_df = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                            datetime.datetime(2007, 1, 1), 3, 1, 1, forecast_horizon=[1, 2, 4])
+
+    assert list(yh_df.index.names) == ['origin', 'horizon']
+    assert list(rmse.index) == [1, 2, 4]
+
+    for h in (1, 2, 4):
+        rmse_h, yh_df_h = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                                    datetime.datetime(2007, 1, 1), 3, 1, 1, forecast_horizon=h)
+
+        by_horizon = yh_df.xs(h, level='horizon')
+        assert np.array_equal(by_horizon.target_date.values, yh_df_h.index.values)
+        assert np.allclose(by_horizon.preds.values, yh_df_h.preds.values)
+        assert np.array_equal(by_horizon.targets.values, yh_df_h.targets.values)
+        assert np.isclose(rmse[h], rmse_h)
+
+    # Every window is fitted once
+    assert yh_df.groupby(level='origin').nfev.nunique().max() == 1
+
+
+def test_recursive_unsorted_horizons(gdp_data, pay_data):
+    rmse, yh_df = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                            datetime.datetime(2007, 1, 1), 3, 1, 1, forecast_horizon=[1, 4])
+
+    rmse_u, yh_df_u = recursive(gdp_data.gdp, pay_data.pay, datetime.datetime(1985, 1, 1),
+                                datetime.datetime(2007, 1, 1), 3, 1, 1, forecast_horizon=[4, 1])
+
+    assert np.allclose(rmse_u[[1, 4]].values, rmse[[1, 4]].values)
+    pd.testing.assert_frame_equal(yh_df_u.sort_index(), yh_df.sort_index())
+    assert yh_df_u.preds.notnull().all()
+
+
+def test_batch(gdp_data, pay_data):
+    targets = pd.DataFrame({'gdp': gdp_data.gdp,
+                            'gdp2': 2. * gdp_data.gdp,
+                            'gdp_late': gdp_data.gdp.where(gdp_data.index >= '1990-01-01'),
+                            'gdp_early': gdp_data.gdp.where(gdp_data.index < '2003-01-01')})
+
+    results = midas_batch(targets, pay_data.pay,
+                          start_date=datetime.datetime(1985, 1, 1),
+                          end_date=datetime.datetime(2009, 1, 1),
+                          xlag=3, ylag=1, horizon=1)
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    res = estimate(y, yl, x)
+
+    assert list(results.index) == ['gdp', 'gdp2', 'gdp_late', 'gdp_early']
+    assert np.allclose(results.loc['gdp', ['a', 'b', 'theta1', 'theta2', 'lag1']].values, res.x)
+    assert np.isclose(results.loc['gdp2', 'a'], 2. * res.x[0], rtol=1e-4)
+    assert results.loc['gdp', 'nobs'] == 97
+    assert results.loc['gdp_late', 'nobs'] == 76
+
+    # A target whose history ends early is fitted up to its last observation and has no forecasts to score
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2002, 10, 1))
+    res = estimate(y, yl, x)
+
+    assert results.loc['gdp_early', 'nobs'] == 72
+    assert np.allclose(results.loc['gdp_early', ['a', 'b', 'theta1', 'theta2', 'lag1']].values, res.x)
+    assert np.isnan(results.loc['gdp_early', 'rmse'])
+    assert np.isfinite(results.loc[['gdp', 'gdp2', 'gdp_late'], 'rmse']).all()
+
+
+def test_batch_gap(gdp_data, pay_data):
+    targets = pd.DataFrame({'gdp_gap': gdp_data.gdp.where(gdp_data.index.year != 1995)})
+
+    with pytest.raises(ValueError, match='gdp_gap'):
+        midas_batch(targets, pay_data.pay,
+                    start_date=datetime.datetime(1985, 1, 1),
+                    end_date=datetime.datetime(2009, 1, 1),
+                    xlag=3, ylag=1, horizon=1)
+
+
+def test_select(gdp_data, pay_data):
+    results = midas_select(gdp_data.gdp, pay_data.pay,
+                           start_date=datetime.datetime(1985, 1, 1),
+                           end_date=datetime.datetime(2009, 1, 1),
+                           xlags=[3, "6m"], ylags=[0, 1], horizon=1)
+
+    assert len(results) == 8
+    assert results.bic.is_monotonic_increasing
+
+    # Every model is fitted on the sample of the largest lags
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 6, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    res = estimate(y, yl, x.iloc[:, :3], poly='expalmon')
+
+    row = results[(results.xlag == 3) & (results.ylag == 1) & (results.poly == 'expalmon')].iloc[0]
+    assert np.isclose(row.ssr, 2 * res.cost)
+    assert row.nparams == 5
+
+
+def test_select_multiple(gdp_data, pay_data):
+    hf = pd.DataFrame({'pay': pay_data.pay, 'pay6': pay_data.pay.rolling(6).mean()})
+
+    results = midas_select(gdp_data.gdp, hf,
+                           start_date=datetime.datetime(1985, 1, 1),
+                           end_date=datetime.datetime(2009, 1, 1),
+                           xlags=[3, (3, 6)], ylags=[1], horizon=1, polys=['beta'])
+
+    assert sorted(results.xlag) == [(3, 3), (3, 6)]
+
+    # The sample is that of the largest lags of each regressor
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, hf, [3, 6], 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    res = estimate(y, yl, x, poly=['beta', 'beta'])
+
+    row = results[results.xlag == (3, 6)].iloc[0]
+    assert np.isclose(row.ssr, 2 * res.cost)
+    assert row.nparams == 8
+
+    with pytest.raises(ValueError, match='one per regressor'):
+        midas_select(gdp_data.gdp, hf, start_date=datetime.datetime(1985, 1, 1),
+                     end_date=datetime.datetime(2009, 1, 1), xlags=[(3, 3, 3)], ylags=[1], horizon=1)
+
+
+def test_estimate_multiple(gdp_data, pay_data):
+    hf = pd.DataFrame({'pay': pay_data.pay, 'pay6': pay_data.pay.rolling(6).mean()})
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, hf, [3, 6], 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+
+    res = estimate(y, yl, x, poly=['beta', 'expalmon'])
+    res_p = estimate(y, yl, x, poly=['beta', 'expalmon'], profile=True)
+
+    assert len(res.x) == 8
+    assert np.isclose(res.cost, res_p.cost)
+
+    fc = forecast(xf, ylf, res, poly=['beta', 'expalmon'])
+    fc_p = forecast(xf, ylf, res_p, poly=['beta', 'expalmon'])
+
+    assert np.allclose(fc.yfh, fc_p.yfh, atol=1e-4)
+
+
+def test_estimate_single_stacked(gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    y, yl, xs, yf, ylf, xfs = mix.mix_freq(gdp_data.gdp, pay_data[['pay']], 3, 1, 1,
+                                           start_date=datetime.datetime(1985, 1, 1),
+                                           end_date=datetime.datetime(2009, 1, 1))
+
+    assert np.allclose(estimate(y, yl, x).x, estimate(y, yl, xs).x)
@@ -1,5 +1,6 @@
 import pytest
 import datetime
+import numpy as np
 import pandas as pd
 
 from midas import mix
@@ -112,6 +113,85 @@ def test_mix_gdp(gdp_data, pay_data):
                                               pay_data.loc['1984-10-01'].pay])
 
 
+def test_design_window(gdp_data, pay_data):
+    design = mix.MixDesign(gdp_data.gdp, pay_data.pay, 3, 1, 1)
+
+    expected = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                            start_date=datetime.datetime(1985, 1, 1),
+                            end_date=datetime.datetime(2009, 1, 1))
+
+    for got, exp in zip(design.window(datetime.datetime(1985, 1, 1), datetime.datetime(2009, 1, 1)), expected):
+        assert got.index.equals(exp.index)
+        assert np.allclose(got.values, exp.values)
+
+
+def test_design_iwindow(lf_data, hf_data):
+    design = mix.MixDesign(lf_data.val, hf_data.val, 3, 1, 1)
+
+    y, yl, x, yf, ylf, xf = design.iwindow(0, 2)
+
+    assert len(design) == 4
+    assert list(y.values) == [2.0, 3.0]
+    assert list(yf.values) == [4.0, 5.0]
+    assert all(x.loc['2009-07-01'].values == [0.6, 0.5, 0.4])
+    assert ylf.loc['2010-04-01'].values[0] == 4.0
+
+
+def test_mix_multiple(lf_data, hf_data):
+    hf = pd.DataFrame({'a': hf_data.val, 'b': 10. * hf_data.val})
+    y, yl, x, yf, ylf, xf = mix.mix_freq(lf_data.val, hf, [3, 2], 1, 1,
+                                         start_date=datetime.datetime(2009, 7, 1),
+                                         end_date=datetime.datetime(2010, 1, 1))
+
+    assert list(x.columns) == [('a', 0), ('a', 1), ('a', 2), ('b', 0), ('b', 1)]
+    assert np.allclose(x.loc['2009-07-01'].values, [0.6, 0.5, 0.4, 6., 5.])
+    assert np.allclose(xf.loc['2010-04-01'].values, [1.5, 1.4, 1.3, 15., 14.])
+
+
+def test_lag_matrix(lf_data, hf_data):
+    x = mix.lag_matrix(hf_data.val, lf_data.index, 3, 1)
+
+    assert x.shape == (5, 3)
+    assert np.allclose(x[1], [0.6, 0.5, 0.4])
+    assert np.allclose(x[3], [1.2, 1.1, 1.0])
+
+
+def test_lag_matrix_out_of_range(lf_data, hf_data):
+    x = mix.lag_matrix(hf_data.val, lf_data.index, 6, -1)
+
+    assert np.isnan(x[0, 5])
+    assert np.allclose(x[0, :5], [0.5, 0.4, 0.3, 0.2, 0.1])
+    assert np.isnan(x[4, 0])
+    assert np.allclose(x[4, 1:], [1.6, 1.5, 1.4, 1.3, 1.2])
+
+
+def test_lag_operator(lf_data, hf_data):
+    positions = hf_data.index.searchsorted(lf_data.index, side='left') + 1
+    x = mix.lag_rows(hf_data.val.values, positions, 6)
+    op = mix.LagOperator(hf_data.val.values, positions, 6)
+
+    assert op.shape == x.shape
+    np.testing.assert_array_equal(np.asarray(op), x)
+
+    w = np.linspace(1., 0.5, 6)
+    np.testing.assert_allclose(op.dot(w), np.dot(x, w))
+    np.testing.assert_allclose(op[1:3].dot(np.column_stack([w, w[::-1]])),
+                               np.dot(x[1:3], np.column_stack([w, w[::-1]])))
+    np.testing.assert_allclose(op.with_lags(2)[[0, 2]].dot(w[:2]), np.dot(x[[0, 2], :2], w[:2]))
+
+
+def test_design_lazy(gdp_data, pay_data):
+    design = mix.MixDesign(gdp_data.gdp, pay_data.pay, 12, 1, 1)
+    lazy = mix.MixDesign(gdp_data.gdp, pay_data.pay, 12, 1, 1, lazy=True)
+
+    assert isinstance(lazy.arrays()[2], mix.LagOperator)
+    np.testing.assert_array_equal(np.asarray(lazy.arrays()[2]), design.arrays()[2])
+    pd.testing.assert_frame_equal(lazy.subset(6, 1).x, design.subset(6, 1).x)
+
+    with pytest.raises(ValueError):
+        mix.MixDesign(gdp_data.gdp, [pay_data.pay, pay_data.pay], 12, 1, 1, lazy=True)
+
+
 def test_data_freq(lf_data, hf_data):
 
     assert mix.data_freq(lf_data)[0] == 'Q'
@@ -0,0 +1,62 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+from midas import mix
+from midas.adl import estimate, forecast
+from midas.nowcast import Nowcast
+
+
+def test_nowcast_update(gdp_data, pay_data):
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    res = estimate(y, yl, x)
+    fc = forecast(xf, ylf, res)
+
+    nc = Nowcast(res, gdp_data.gdp[:'2009-01-01'], pay_data.pay[:'2009-01-01'], 3, 1, 1)
+
+    assert nc.target_date == pd.Timestamp('2009-04-01')
+    assert nc.missing == [2]
+
+    nc.update(pay_data.pay['2009-02-01'])
+
+    assert nc.missing == [1]
+
+    # Observations after the target period's last lag don't change the nowcast
+    value = nc.update(pay_data.pay['2009-03-01':'2009-06-01'].values)
+
+    assert nc.missing == [0]
+    assert np.isclose(value, fc.loc['2009-04-01'].iloc[0])
+
+
+def test_nowcast_fit(gdp_data, pay_data):
+    nc = Nowcast.fit(gdp_data.gdp[:'2009-01-01'], pay_data.pay, 3, 1, 1,
+                     start_date=datetime.datetime(1985, 1, 1))
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, pay_data.pay, 3, 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    fc = forecast(xf, ylf, estimate(y, yl, x))
+
+    assert nc.missing == [0]
+    assert np.isclose(nc.value, fc.loc['2009-04-01'].iloc[0])
+
+
+def test_nowcast_multiple(gdp_data, pay_data):
+    hf = pd.DataFrame({'pay': pay_data.pay, 'pay6': pay_data.pay.rolling(6).mean()})
+
+    y, yl, x, yf, ylf, xf = mix.mix_freq(gdp_data.gdp, hf, [3, 6], 1, 1,
+                                         start_date=datetime.datetime(1985, 1, 1),
+                                         end_date=datetime.datetime(2009, 1, 1))
+    res = estimate(y, yl, x, poly=['beta', 'expalmon'])
+    fc = forecast(xf, ylf, res, poly=['beta', 'expalmon'])
+
+    nc = Nowcast(res, gdp_data.gdp[:'2009-01-01'], hf[:'2009-02-01'], [3, 6], 1, 1, poly=['beta', 'expalmon'])
+
+    assert nc.missing == [1, 1]
+
+    nc.update(hf.pay['2009-03-01'], regressor=0)
+    nc.update(hf.pay6['2009-03-01'], regressor=1)
+
+    assert np.isclose(nc.value, fc.loc['2009-04-01'].iloc[0])
@@ -0,0 +1,74 @@
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from midas import mix, store
+from midas.adl import rolling
+
+
+def test_save_load(tmp_path, gdp_data, pay_data):
+    path = str(tmp_path / 'pay')
+    store.save(pay_data.pay, path)
+
+    pay = store.load(path)
+
+    pd.testing.assert_series_equal(pay, pay_data.pay, check_index_type=False, check_freq=False)
+    assert not pay.values.flags.writeable
+
+    expected = mix.mix_freq(gdp_data.gdp, pay_data.pay, 12, 1, 1, start_date='1985-01-01', end_date='2009-01-01')
+    mapped = mix.mix_freq(gdp_data.gdp, pay, 12, 1, 1, start_date='1985-01-01', end_date='2009-01-01')
+
+    for e, m in zip(expected, mapped):
+        np.testing.assert_array_equal(e.values, m.values)
+
+
+def test_save_load_frame(tmp_path, pay_data):
+    path = str(tmp_path / 'pay')
+    store.save(pay_data, path)
+
+    pd.testing.assert_frame_equal(store.load(path, mmap=False), pay_data.astype(float), check_index_type=False,
+                                  check_freq=False)
+
+
+def test_load_csv(tmp_path):
+    csv = str(tmp_path / 'GDP.csv')
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'data', 'gdp.csv'), csv)
+
+    gdp = store.load_csv(csv, index_col=0, parse_dates=True, squeeze=True)
+    stores = os.listdir(str(tmp_path / '.midas_store'))
+
+    assert gdp.name == 'GDP'
+    assert isinstance(gdp.index, pd.DatetimeIndex)
+    assert len(stores) == 1
+
+    # Later calls load the store rather than parsing the file
+    mtime = os.stat(str(tmp_path / '.midas_store' / stores[0] / 'values.npy')).st_mtime_ns
+    pd.testing.assert_series_equal(store.load_csv(csv, index_col=0, parse_dates=True, squeeze=True), gdp)
+    assert os.stat(str(tmp_path / '.midas_store' / stores[0] / 'values.npy')).st_mtime_ns == mtime
+
+
+def test_lazy_design_pickles_mapped_values(tmp_path, gdp_data, pay_data):
+    path = str(tmp_path / 'pay')
+    store.save(pay_data.pay, path)
+    pay = store.load(path)
+
+    design = mix.MixDesign(gdp_data.gdp, pay, 24, 1, 1, lazy=True)
+    copied = mix.MixDesign(gdp_data.gdp, pay_data.pay, 24, 1, 1, lazy=True)
+
+    # The mapped values travel as a reference to the store's file
+    data = pickle.dumps(design)
+    assert len(data) < len(pickle.dumps(copied)) - pay_data.pay.values.nbytes // 2
+
+    restored = pickle.loads(data)
+    x = restored.arrays()[2]
+    assert isinstance(x.values, np.memmap)
+    np.testing.assert_array_equal(np.asarray(x), np.asarray(design.arrays()[2]))
+
+    rmse, yh_df = rolling(gdp_data.gdp, pay, '1985-01-01', None, 3, 1, 1, lazy=True)
+    rmse_p, yh_df_p = rolling(gdp_data.gdp, pay, '1985-01-01', None, 3, 1, 1, lazy=True, n_jobs=2)
+
+    assert rmse == rmse_p
+    assert yh_df.equals(yh_df_p)
@@ -0,0 +1,92 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from midas import vintage
+from midas.nowcast import Nowcast
+from midas.vintage import read_vintages, vintage_at, realtime
+
+
+def make_vintages(series, lag, releases):
+    """
+    Vintages of series in which each observation is published lag after its date
+    """
+    published = series.dropna()
+    columns = {release: published[published.index + lag <= release] for release in releases}
+
+    vintages = pd.DataFrame(columns).reindex(published.index)
+    vintages.columns = pd.DatetimeIndex(vintages.columns, name=series.name)
+
+    return vintages
+
+
+def test_read_vintages():
+    path = os.path.join(os.path.dirname(__file__), '..', 'examples', 'gdp-pay.csv')
+
+    gdp = read_vintages(path, 'GDP')
+
+    assert list(gdp.columns) == [pd.Timestamp('2009-09-30')]
+    assert gdp.columns.name == 'GDP'
+    assert gdp.iloc[:, 0].dropna().index[-1] == pd.Timestamp('2009-04-01')
+
+    assert vintage_at(gdp, datetime.datetime(2009, 10, 1)) == pd.Timestamp('2009-09-30')
+
+
+def test_realtime(gdp_data, pay_data, monkeypatch):
+    y_vintages = make_vintages(gdp_data.gdp, pd.DateOffset(months=4), pd.date_range('2007-01-01', '2009-06-01',
+                                                                                   freq='QS'))
+    x_vintages = make_vintages(pay_data.pay, pd.DateOffset(months=1, days=4),
+                               pd.date_range('2007-01-01', '2009-06-01', freq='MS') + pd.DateOffset(days=4))
+
+    fits = []
+
+    def counting_estimate(*args, **kwargs):
+        fits.append(1)
+        return estimate(*args, **kwargs)
+
+    estimate = vintage.estimate
+    monkeypatch.setattr(vintage, 'estimate', counting_estimate)
+
+    start_date = datetime.datetime(1985, 1, 1)
+    err, table = realtime(y_vintages, x_vintages, start_date, 3, 1, 1)
+
+    # Monthly releases between two low-frequency vintages share the fit
+    assert len(table) == len(y_vintages.columns.union(x_vintages.columns)[1:])
+    assert len(fits) == table.y_vintage.nunique()
+
+    origin = pd.Timestamp('2008-08-05')
+    y_in = y_vintages[vintage_at(y_vintages, origin)].dropna().rename('gdp')
+    x_in = x_vintages[vintage_at(x_vintages, origin)].dropna().rename('pay')
+
+    nc = Nowcast.fit(y_in, x_in, 3, 1, 1, start_date=start_date)
+
+    assert table.target_date[origin] == pd.Timestamp('2008-04-01')
+    assert np.isclose(table.preds[origin], nc.value)
+    assert np.isclose(table.targets[origin], gdp_data.gdp['2008-04-01'])
+    assert np.isfinite(err)
+
+
+def test_realtime_revision(gdp_data, pay_data, monkeypatch):
+    y_vintages = make_vintages(gdp_data.gdp, pd.DateOffset(months=4), [pd.Timestamp('2009-01-01')])
+    x_vintages = make_vintages(pay_data.pay, pd.DateOffset(months=1, days=4),
+                               pd.date_range('2009-01-01', '2009-03-01', freq='MS') + pd.DateOffset(days=4))
+
+    # A benchmark revision of the regressor's history needs a new fit
+    x_vintages.loc[:'2000-01-01', x_vintages.columns[-1]] += 0.1
+
+    fits = []
+
+    def counting_estimate(*args, **kwargs):
+        fits.append(1)
+        return estimate(*args, **kwargs)
+
+    estimate = vintage.estimate
+    monkeypatch.setattr(vintage, 'estimate', counting_estimate)
+
+    _, table = realtime(y_vintages, x_vintages, datetime.datetime(1985, 1, 1), 3, 1, 1)
+
+    assert list(table.x_vintage) == list(x_vintages.columns)
+    assert len(fits) == 2
+    assert table.preds.iloc[0] != table.preds.iloc[2]
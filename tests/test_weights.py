@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import pytest
 
-from midas.weights import ExpAlmonWeights, BetaWeights
+from midas.weights import (ExpAlmonWeights, BetaWeights, StackedWeights, AlmonWeights, UnrestrictedWeights,
+                           polynomial_weights)
 
 
 def test_beta_es():
@@ -25,7 +29,122 @@ def test_x_weighted():
     x = np.ones((3, 3))
     bw = BetaWeights(1., 5.)
 
-    xw, w = bw.x_weighted(x, [1., 5.])
+    xw = bw.x_weighted(x, [1., 5.])
 
     assert x.shape[0] == xw.shape[0]
     assert np.allclose(xw, [1., 1., 1.])
+
+
+def test_x_weighted_return_weights():
+    x = np.ones((3, 3))
+    bw = BetaWeights(1., 5.)
+
+    xw, w = bw.x_weighted(x, [1., 5.], return_weights=True)
+
+    assert np.allclose(xw, [1., 1., 1.])
+    assert np.allclose(w, [0.941176, 0.0588238, 9.4118e-25])
+
+
+def test_x_weighted_stateless():
+    bw = BetaWeights(1., 5.)
+
+    bw.x_weighted(np.ones((3, 3)), [2., 2.])
+
+    assert bw.theta1 == 1. and bw.theta2 == 5.
+    assert np.allclose(bw.weights(3), [0.941176, 0.0588238, 9.4118e-25])
+
+
+def test_shared_weights_threads():
+    x = np.random.default_rng(0).normal(size=(50, 12))
+    wm = polynomial_weights('beta')
+    params = [[1. + 0.1 * i, 5. - 0.1 * i] for i in range(40)]
+
+    expected = [BetaWeights(1., 5.).x_weighted(x, p) for p in params]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda p: wm.x_weighted(x, p), params))
+
+    assert all(np.array_equal(r, e) for r, e in zip(results, expected))
+    assert polynomial_weights('beta') is wm
+
+
+def finite_difference_jacobian(weight_method, nlags, params, eps=1e-6):
+    jac = []
+    for i in range(len(params)):
+        dp = np.array(params, dtype=float)
+        dm = np.array(params, dtype=float)
+        dp[i] += eps / 2
+        dm[i] -= eps / 2
+        wp = weight_method.weights(nlags, dp)
+        wm = weight_method.weights(nlags, dm)
+        jac.append((wp - wm) / eps)
+
+    return np.column_stack(jac)
+
+
+def test_beta_jacobian():
+    bw = BetaWeights(1., 5.)
+
+    for params in ([1., 5.], [1.5, 3.], [2., 2.]):
+        assert np.allclose(bw.weights_jacobian(12, params), finite_difference_jacobian(bw, 12, params), atol=1e-6)
+
+
+def test_beta_nz_jacobian():
+    bw = BetaWeights(1., 5., 0.1)
+
+    assert np.allclose(bw.weights_jacobian(12, [1.5, 3.]), finite_difference_jacobian(bw, 12, [1.5, 3.]), atol=1e-6)
+
+
+def test_almon_jacobian():
+    aw = ExpAlmonWeights(-1., 0.)
+
+    for params in ([-1., 0.], [0.01, -0.0025], [0.2, -0.05]):
+        assert np.allclose(aw.weights_jacobian(12, params), finite_difference_jacobian(aw, 12, params), atol=1e-6)
+
+
+def test_stacked_weights():
+    x = np.random.default_rng(0).normal(size=(20, 7))
+    sw = StackedWeights([BetaWeights(1., 5.), ExpAlmonWeights(-1., 0.)], [3, 4])
+    params = np.array([1.5, 3., 0.1, -0.05])
+
+    xw = sw.x_weighted(x, params)
+
+    assert xw.shape == (20, 2)
+    assert np.allclose(xw[:, 0], BetaWeights(1., 5.).x_weighted(x[:, :3], params[:2]))
+    assert np.allclose(xw[:, 1], ExpAlmonWeights(-1., 0.).x_weighted(x[:, 3:], params[2:]))
+    assert list(sw.param_regressor) == [0, 0, 1, 1]
+
+    jac = sw.x_weighted_jacobian(x, params)
+
+    assert np.allclose(jac[:, :2], np.dot(x[:, :3], BetaWeights(1., 5.).weights_jacobian(3, params[:2])))
+    assert np.allclose(jac[:, 2:], np.dot(x[:, 3:], ExpAlmonWeights(-1., 0.).weights_jacobian(4, params[2:])))
+
+    # A fit's stacked weight method can be passed back as poly
+    assert polynomial_weights(sw, [3, 4]) is sw
+
+
+def test_linear_weights():
+    aw = AlmonWeights(2)
+    params = np.array([0.5, -1., 2.])
+    ilag = np.arange(1, 7) / 6.
+
+    assert np.allclose(aw.weights(6, params), 0.5 - ilag + 2. * ilag ** 2)
+    assert np.allclose(aw.weights_jacobian(6, params), finite_difference_jacobian(aw, 6, params))
+
+    x = np.random.default_rng(0).normal(size=(20, 6))
+    assert np.allclose(np.dot(aw.x_basis(x), params), aw.x_weighted(x, params))
+
+    uw = polynomial_weights('umidas', 6)
+    assert uw.num_params == 6
+    assert np.allclose(uw.x_weighted(x, np.arange(6.)), np.dot(x, np.arange(6.)))
+
+    with pytest.raises(ValueError):
+        polynomial_weights('umidas').num_params
+
+    sw = polynomial_weights(['umidas', 'almon'], [2, 4])
+    assert sw.linear
+    assert sw.num_params == 5
+    assert np.allclose(sw.x_basis(x), np.hstack([x[:, :2], np.dot(x[:, 2:], aw.basis(4))]))
+
+    with pytest.raises(ValueError):
+        StackedWeights([UnrestrictedWeights(2), BetaWeights(1., 5.)], [2, 4])